@@ -0,0 +1,66 @@
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+
+# WAL пускает читателей параллельно с писателем, а synchronous=NORMAL
+# в режиме WAL не теряет целостность, только последние транзакции
+# при отключении питания.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+BUSY_ATTEMPTS = 5
+BUSY_DELAY = 0.05
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created: настраивает новое соединение SQLite."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+        if connection.alias in settings.POST_SHARDS:
+            # Посты и комментарии в шардах ссылаются на пользователей и
+            # группы из default: SQLite не умеет проверять внешние ключи
+            # между файлами. Внутри шарда (комментарий — пост) они тоже
+            # не проверяются, их целостность держат удаления без
+            # Collector в moderation и signals.
+            cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+def is_busy(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def retry_on_busy(func=None, attempts=BUSY_ATTEMPTS, delay=BUSY_DELAY):
+    """Повторяет функцию, если SQLite ответил «database is locked».
+
+    Повторять можно только целую транзакцию, поэтому внутри уже открытого
+    atomic ошибка пробрасывается сразу.
+    """
+    if func is None:
+        return lambda func: retry_on_busy(
+            func, attempts=attempts, delay=delay
+        )
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                last = attempt == attempts - 1
+                if (last or not is_busy(error)
+                        or transaction.get_connection().in_atomic_block):
+                    raise
+            time.sleep(delay * 2 ** attempt * (1 + random.random()))
+    return wrapper
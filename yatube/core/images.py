@@ -0,0 +1,52 @@
+from sorl.thumbnail import get_thumbnail
+
+# Ширины вариантов для srcset и пропорции карточки поста 960x339.
+RESPONSIVE_WIDTHS = (320, 640, 960)
+ASPECT_RATIO = 339 / 960
+# Первым идёт формат для <source>, последним — запасной для <img>.
+FORMATS = (
+    ('WEBP', 'image/webp'),
+    ('JPEG', 'image/jpeg'),
+)
+SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+def geometry(width):
+    return f'{width}x{round(width * ASPECT_RATIO)}'
+
+
+def responsive_variants(image, widths=RESPONSIVE_WIDTHS):
+    """Миниатюры всех ширин и форматов для <picture>.
+
+    Возвращает словарь с srcset для каждого формата и размерами самого
+    крупного варианта, которые нужны атрибутам width и height.
+    """
+    sources = []
+    for image_format, mime_type in FORMATS:
+        thumbnails = [
+            get_thumbnail(
+                image,
+                geometry(width),
+                crop='center',
+                upscale=True,
+                format=image_format,
+            )
+            for width in widths
+        ]
+        sources.append({
+            'type': mime_type,
+            'srcset': ', '.join(
+                f'{thumbnail.url} {width}w'
+                for thumbnail, width in zip(thumbnails, widths)
+            ),
+            'fallback': thumbnails[-1],
+        })
+    largest = sources[-1]['fallback']
+    return {
+        'sources': sources[:-1],
+        'img': sources[-1],
+        'width': widths[-1],
+        'height': round(widths[-1] * ASPECT_RATIO),
+        'src': largest.url,
+        'sizes': SIZES,
+    }
@@ -0,0 +1,322 @@
+"""Нагрузочное тестирование: WSGI-сервер в нескольких процессах и клиенты."""
+import io
+import math
+import multiprocessing
+import random
+import re
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+from django.db import connections
+
+# Границы корзин гистограммы задержек, в миллисекундах.
+HISTOGRAM_BUCKETS = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000,
+)
+REQUEST_TIMEOUT = 30
+LOGIN_PATH = '/auth/login/'
+# Не ответы сервера, а признаки провала: сбой соединения, неудачный
+# вход (форма снова отдаётся с кодом 200) и редирект на вход в
+# сценарии, которому нужен пользователь.
+FAILURES = ('error', 'login_failed', 'login_redirect')
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+# 1x1 GIF для сценария публикации с картинкой.
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xff\xff\xff\x21\xf9\x04\x00\x00\x00\x00\x00\x2c\x00\x00\x00\x00'
+    b'\x01\x00\x01\x00\x00\x02\x02\x44\x01\x00\x3b'
+)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def start_servers(application, workers, host='127.0.0.1', port=0):
+    """Слушает один сокет и обслуживает его workers процессами.
+
+    Возвращает адрес и список процессов, которые нужно остановить.
+    """
+    server = make_server(
+        host, port, application,
+        server_class=ThreadingWSGIServer, handler_class=QuietHandler,
+    )
+    # Соединения с базой не должны переходить в дочерние процессы.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    processes = [
+        context.Process(target=server.serve_forever, daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    server.socket.close()
+    return f'http://{host}:{server.server_port}', processes
+
+
+def stop_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+class Client:
+    """Сессия одного виртуального пользователя с записью замеров."""
+
+    def __init__(self, base_url, stats):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.stats = stats
+        # Выполняется ли сценарий, которому нужен вошедший пользователь.
+        self.requires_login = False
+
+    def request(self, name, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path,
+                timeout=REQUEST_TIMEOUT, allow_redirects=False, **kwargs
+            )
+        except requests.RequestException:
+            self.stats.record(name, None, time.perf_counter() - started)
+            return None
+        self.stats.record(
+            name, self.status(name, response),
+            time.perf_counter() - started,
+        )
+        return response
+
+    def status(self, name, response):
+        if name == 'login' and response.status_code != 302:
+            return 'login_failed'
+        location = urlparse(response.headers.get('Location', '')).path
+        if (self.requires_login and response.is_redirect
+                and location.startswith(LOGIN_PATH)):
+            return 'login_redirect'
+        return response.status_code
+
+    def csrf(self, response):
+        match = response is not None and CSRF_INPUT.search(response.text)
+        return match.group(1) if match else ''
+
+    def login(self, username, password):
+        page = self.request('login_form', 'GET', LOGIN_PATH)
+        self.request('login', 'POST', LOGIN_PATH, data={
+            'username': username,
+            'password': password,
+            'csrfmiddlewaretoken': self.csrf(page),
+        })
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        # Границы реально измеренного окна, time.time().
+        self.started = self.finished = None
+
+    def record(self, name, status, seconds):
+        self.latencies[name].append(seconds * 1000)
+        self.statuses[name][str(status or 'error')] += 1
+
+    def measure(self, started, finished):
+        self.started = min(filter(None, (self.started, started)))
+        self.finished = max(filter(None, (self.finished, finished)))
+
+    def duration(self):
+        if self.started is None:
+            return 0
+        return self.finished - self.started
+
+    def merge(self, other):
+        if other.started is not None:
+            self.measure(other.started, other.finished)
+        for name, values in other.latencies.items():
+            self.latencies[name].extend(values)
+        for name, statuses in other.statuses.items():
+            for status, count in statuses.items():
+                self.statuses[name][status] += count
+
+    def __getstate__(self):
+        return {
+            'latencies': dict(self.latencies),
+            'statuses': {
+                name: dict(value) for name, value in self.statuses.items()
+            },
+            'window': (self.started, self.finished),
+        }
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.started, self.finished = state['window']
+        self.latencies.update(state['latencies'])
+        for name, statuses in state['statuses'].items():
+            self.statuses[name].update(statuses)
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, math.ceil(share * len(ordered)) - 1)
+    return round(ordered[max(index, 0)], 2)
+
+
+def histogram(values):
+    buckets = {f'<={bound}ms': 0 for bound in HISTOGRAM_BUCKETS}
+    buckets['>10000ms'] = 0
+    for value in values:
+        for bound in HISTOGRAM_BUCKETS:
+            if value <= bound:
+                buckets[f'<={bound}ms'] += 1
+                break
+        else:
+            buckets['>10000ms'] += 1
+    return buckets
+
+
+def is_error(status):
+    """Ошибка — всё, кроме 1xx–3xx и 429, который считается отдельно."""
+    if status in FAILURES:
+        return True
+    return status[0] in '45' and status != '429'
+
+
+def summarize(values, statuses, seconds):
+    total = sum(statuses.values())
+    errors = sum(
+        count for status, count in statuses.items() if is_error(status)
+    )
+    return {
+        'requests': total,
+        'rps': round(total / seconds, 2) if seconds else 0,
+        'errors': errors,
+        'error_rate': round(errors / total, 4) if total else 0,
+        'throttled': statuses.get('429', 0),
+        'statuses': dict(sorted(statuses.items())),
+        'latency_ms': {
+            'p50': percentile(values, 0.5),
+            'p90': percentile(values, 0.9),
+            'p99': percentile(values, 0.99),
+            'max': round(max(values), 2) if values else None,
+        },
+        'histogram': histogram(values),
+    }
+
+
+def report(stats, seconds=None):
+    """Сводка; запросы в секунду — за измеренное время, а не заданное."""
+    if seconds is None:
+        seconds = round(stats.duration(), 3)
+    all_values = [
+        value for values in stats.latencies.values() for value in values
+    ]
+    all_statuses = defaultdict(int)
+    for statuses in stats.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] += count
+    return {
+        'duration': seconds,
+        'total': summarize(all_values, all_statuses, seconds),
+        'requests': {
+            name: summarize(
+                stats.latencies[name], stats.statuses[name], seconds
+            )
+            for name in sorted(stats.latencies)
+        },
+    }
+
+
+# Сценарии: одна итерация поведения пользователя.
+
+def browse(client, rng, targets):
+    client.request('index', 'GET', '/')
+    client.request('index_page', 'GET', f'/?page={rng.randint(2, 50)}')
+    if targets['groups']:
+        slug = rng.choice(targets['groups'])
+        client.request('group_posts', 'GET', f'/group/{slug}/')
+    if targets['users']:
+        username = rng.choice(targets['users'])
+        client.request('profile', 'GET', f'/profile/{username}/')
+    if targets['posts']:
+        post_id = rng.choice(targets['posts'])
+        client.request('post_detail', 'GET', f'/posts/{post_id}/')
+
+
+def follow_feed(client, rng, targets):
+    for _ in range(3):
+        client.request('follow_index', 'GET', '/follow/')
+
+
+def post_with_image(client, rng, targets):
+    form = client.request('post_form', 'GET', '/create/')
+    client.request('post_create', 'POST', '/create/', data={
+        'text': f'Нагрузочный пост {rng.random()}',
+        'csrfmiddlewaretoken': client.csrf(form),
+    }, files={'image': ('load.gif', io.BytesIO(SMALL_GIF), 'image/gif')})
+
+
+def comment_burst(client, rng, targets):
+    if not targets['posts']:
+        return
+    post_id = rng.choice(targets['posts'])
+    page = client.request('post_detail', 'GET', f'/posts/{post_id}/')
+    token = client.csrf(page)
+    for number in range(5):
+        client.request(
+            'add_comment', 'POST', f'/posts/{post_id}/comment',
+            data={'text': f'Комментарий {number}',
+                  'csrfmiddlewaretoken': token},
+        )
+
+
+SCENARIOS = {
+    'browse': (browse, False),
+    'follow': (follow_feed, True),
+    'post': (post_with_image, True),
+    'comment': (comment_burst, True),
+}
+
+
+def run_client(arguments):
+    """Процесс-клиент: выполняет сценарии до истечения времени."""
+    number, base_url, weights, targets, password, seconds, seed = arguments
+    rng = random.Random(f'{seed}:{number}')
+    stats = Stats()
+    client = Client(base_url, stats)
+    names = list(weights)
+    if targets['users'] and any(SCENARIOS[name][1] for name in names):
+        client.login(rng.choice(targets['users']), password)
+    started = time.time()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights=[weights[n] for n in names])[0]
+        scenario, client.requires_login = SCENARIOS[name]
+        scenario(client, rng, targets)
+    stats.measure(started, time.time())
+    return stats
+
+
+def run_clients(base_url, clients, weights, targets, password, seconds,
+                seed=0):
+    arguments = [
+        (number, base_url, weights, targets, password, seconds, seed)
+        for number in range(clients)
+    ]
+    context = multiprocessing.get_context('fork')
+    stats = Stats()
+    with context.Pool(clients) as pool:
+        for result in pool.imap_unordered(run_client, arguments):
+            stats.merge(result)
+    return stats
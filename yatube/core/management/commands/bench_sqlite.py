@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db import SQLITE_PRAGMAS
+
+# Настройки SQLite по умолчанию, с которыми работал проект раньше.
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+DEFAULT_TIMEOUT = 5
+TUNED_TIMEOUT = 20
+
+
+def connect(path, pragmas, timeout):
+    connection = sqlite3.connect(
+        path, timeout=timeout, isolation_level=None,
+        check_same_thread=False,
+    )
+    for pragma, value in pragmas.items():
+        connection.execute(f'PRAGMA {pragma} = {value}')
+    return connection
+
+
+class Counters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writes = self.reads = self.errors = 0
+
+    def add(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def write(connection, number, deadline, counters):
+    while time.monotonic() < deadline:
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute(
+                'INSERT INTO comment (post_id, text, created) '
+                'VALUES (?, ?, ?)',
+                (number, 'Комментарий', time.time()),
+            )
+            connection.execute('COMMIT')
+            counters.add('writes')
+        except sqlite3.OperationalError:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            counters.add('errors')
+    connection.close()
+
+
+def read(connection, number, deadline, counters):
+    while time.monotonic() < deadline:
+        try:
+            connection.execute(
+                'SELECT id, text FROM comment WHERE post_id = ? '
+                'ORDER BY id DESC LIMIT 10',
+                (number,),
+            ).fetchall()
+            counters.add('reads')
+        except sqlite3.OperationalError:
+            counters.add('errors')
+    connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками по '
+        'умолчанию и с настройками core.db при параллельных записи и чтении'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help='Длительность каждого прогона',
+        )
+
+    def handle(self, *args, **options):
+        for label, pragmas, timeout in (
+            ('по умолчанию', DEFAULT_PRAGMAS, DEFAULT_TIMEOUT),
+            ('WAL и PRAGMA из core.db', SQLITE_PRAGMAS, TUNED_TIMEOUT),
+        ):
+            writes, reads, errors = self.run(pragmas, timeout, options)
+            seconds = options['seconds']
+            self.stdout.write(
+                f'{label}: записей/с {writes / seconds:.0f}, '
+                f'чтений/с {reads / seconds:.0f}, '
+                f'ошибок блокировки {errors}'
+            )
+
+    def run(self, pragmas, timeout, options):
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'bench.sqlite3')
+        setup = connect(path, pragmas, timeout)
+        setup.execute(
+            'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+            'text TEXT, created REAL)'
+        )
+        setup.execute('CREATE INDEX comment_post ON comment (post_id)')
+        setup.close()
+        counters = Counters()
+        deadline = time.monotonic() + options['seconds']
+        threads = [
+            threading.Thread(target=target, args=(
+                connect(path, pragmas, timeout), number, deadline, counters,
+            ))
+            for target, count in (
+                (write, options['writers']), (read, options['readers']),
+            )
+            for number in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+        return counters.writes, counters.reads, counters.errors
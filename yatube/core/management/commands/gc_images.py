@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from core.models import StoredFile
+from core.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из ContentAddressedStorage файлы, на которые больше '
+        'не ссылается ни один пост, вместе с их миниатюрами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-minutes', type=int, default=60,
+            help='Не трогать файлы, счётчик которых менялся недавно',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        storage = ContentAddressedStorage()
+        unreferenced = StoredFile.objects.filter(
+            refcount__lte=0,
+            updated__lt=timezone.now() - timedelta(
+                minutes=options['grace_minutes']
+            ),
+        )
+        last_pk = 0
+        deleted = 0
+        while True:
+            batch = list(unreferenced.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', 'name')[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name in batch:
+                if options['dry_run']:
+                    self.stdout.write(name)
+                    continue
+                # Повторная проверка защищает от гонки с загрузкой: save()
+                # хранилища обновляет updated у файла, который вернул.
+                released = unreferenced.filter(pk=pk).delete()[0]
+                if released:
+                    delete_with_thumbnails(ImageFile(name, storage))
+                    deleted += 1
+        self.stdout.write(f'Удалено файлов: {deleted}')
@@ -0,0 +1,205 @@
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models, router
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail import delete as forget_thumbnails
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.models import KVStore
+
+from core.models import StoredFile
+
+
+def walk(root, exclude=None):
+    """Потоково обходит дерево через os.scandir: (путь, размер, mtime)."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path != exclude:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    relative = os.path.relpath(entry.path, root)
+                    yield (
+                        relative.replace(os.sep, '/'),
+                        stat.st_size,
+                        stat.st_mtime,
+                    )
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def file_fields():
+    return [
+        field
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField)
+    ]
+
+
+def model_aliases(model):
+    """Базы с таблицей модели: посты лежат и в шардах, и в default."""
+    return [
+        alias for alias in settings.DATABASES
+        if router.allow_migrate_model(alias, model)
+    ]
+
+
+def referenced_files(names, fields):
+    referenced = set()
+    for field in fields:
+        for alias in model_aliases(field.model):
+            referenced.update(
+                field.model._default_manager.using(alias).filter(**{
+                    f'{field.name}__in': names
+                }).values_list(field.name, flat=True)
+            )
+    return referenced
+
+
+def known_thumbnails(names):
+    """Миниатюры, о которых знает key-value хранилище sorl-thumbnail."""
+    keys = {
+        '||'.join((
+            thumbnail_settings.THUMBNAIL_KEY_PREFIX,
+            'image',
+            ImageFile(name, default.storage).key,
+        )): name
+        for name in names
+    }
+    found = KVStore.objects.filter(key__in=keys).values_list('key', flat=True)
+    return {keys[key] for key in found}
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет из MEDIA_ROOT файлы, на которые не ссылается ни одна '
+        'модель, и миниатюры sorl-thumbnail, которых нет в его хранилище'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько файлов удалять параллельно',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--kvstore-cleanup', action='store_true',
+            help='Сначала убрать из хранилища sorl записи о пропавших файлах',
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.cutoff = time.time() - options['min_age']
+        self.root = settings.MEDIA_ROOT
+        self.files = self.bytes = 0
+        thumbnails_root = os.path.join(
+            self.root, thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+        )
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            self.pool = pool
+            self.collect_sources(thumbnails_root)
+            if options['kvstore_cleanup'] and not options['dry_run']:
+                default.kvstore.cleanup()
+            self.collect_thumbnails(thumbnails_root)
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(
+            f'{verb} файлов: {self.files}, освобождено байт: {self.bytes}'
+        )
+
+    def old_files(self, root, exclude=None):
+        return (
+            (name, size)
+            for name, size, mtime in walk(root, exclude)
+            if mtime < self.cutoff
+        )
+
+    def collect_sources(self, thumbnails_root):
+        fields = file_fields()
+        storages = {field.storage for field in fields}
+        for batch in chunked(
+            self.old_files(self.root, exclude=thumbnails_root),
+            self.options['batch_size'],
+        ):
+            names = [name for name, _ in batch]
+            referenced = referenced_files(names, fields)
+            # Повторная загрузка того же файла не меняет его mtime, только
+            # StoredFile.updated: пост с ним может быть ещё не записан.
+            referenced.update(StoredFile.objects.filter(
+                name__in=names,
+                updated__gte=datetime.fromtimestamp(
+                    self.cutoff, tz=timezone.utc
+                ),
+            ).values_list('name', flat=True))
+            orphans = [item for item in batch if item[0] not in referenced]
+            if orphans and not self.options['dry_run']:
+                for name, _ in orphans:
+                    # Убирает записи sorl и файлы миниатюр этого исходника.
+                    for storage in storages:
+                        forget_thumbnails(
+                            ImageFile(name, storage), delete_file=False
+                        )
+                StoredFile.objects.filter(
+                    name__in=[name for name, _ in orphans]
+                ).delete()
+            self.delete(orphans, self.root)
+
+    def collect_thumbnails(self, thumbnails_root):
+        prefix = thumbnail_settings.THUMBNAIL_PREFIX.strip('/') + '/'
+        for batch in chunked(
+            self.old_files(thumbnails_root), self.options['batch_size']
+        ):
+            batch = [(prefix + name, size) for name, size in batch]
+            known = known_thumbnails([name for name, _ in batch])
+            self.delete(
+                [item for item in batch if item[0] not in known], self.root
+            )
+
+    def delete(self, orphans, root):
+        for name, size in orphans:
+            self.files += 1
+            self.bytes += size
+            if self.options['dry_run']:
+                self.stdout.write(name)
+        if not self.options['dry_run']:
+            list(self.pool.map(
+                remove, (os.path.join(root, name) for name, _ in orphans)
+            ))
@@ -0,0 +1,115 @@
+import json
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+from posts import shards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+# Столько имён, групп и постов выбирается из базы для запросов клиентов.
+TARGETS_SAMPLE = 500
+
+
+def sample(values, rng):
+    values = list(values[:TARGETS_SAMPLE * 4])
+    return rng.sample(values, min(len(values), TARGETS_SAMPLE))
+
+
+def parse_weights(value):
+    """'browse=6,comment=1' → {'browse': 6, 'comment': 1}."""
+    weights = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in loadtest.SCENARIOS:
+            raise CommandError(f'Неизвестный сценарий: {name}')
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f'Неверный вес сценария: {item}')
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает приложение из yatube/wsgi.py в нескольких процессах '
+        'и нагружает его сценариями из пула процессов-клиентов. Отчёт с '
+        'запросами в секунду, гистограммами задержек и долей ошибок '
+        'записывается в JSON, который удобно сравнивать между релизами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Нагружать уже запущенный сервер вместо локального',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Процессов локального сервера',
+        )
+        parser.add_argument(
+            '--clients', type=int, default=8,
+            help='Процессов-клиентов',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=30,
+            help='Длительность прогона в секундах',
+        )
+        parser.add_argument(
+            '--scenarios', default='browse=6,follow=2,post=1,comment=1',
+            help='Сценарии и их веса через запятую',
+        )
+        parser.add_argument(
+            '--password', default='yatube-password',
+            help='Пароль пользователей для сценариев со входом',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='loadtest-report.json')
+
+    def handle(self, *args, **options):
+        weights = parse_weights(options['scenarios'])
+        rng = random.Random(options['seed'])
+        targets = {
+            'users': sample(User.objects.filter(is_active=True).values_list(
+                'username', flat=True
+            ), rng),
+            'groups': sample(
+                Group.objects.values_list('slug', flat=True), rng
+            ),
+            'posts': [post.pk for post in sample(
+                shards.scatter(Post.objects.only('pk', 'pub_date')), rng
+            )],
+        }
+        processes = []
+        base_url = options['url']
+        if not base_url:
+            from yatube.wsgi import application
+            base_url, processes = loadtest.start_servers(
+                application, options['workers']
+            )
+        try:
+            stats = loadtest.run_clients(
+                base_url.rstrip('/'), options['clients'], weights, targets,
+                options['password'], options['duration'], options['seed'],
+            )
+        finally:
+            loadtest.stop_servers(processes)
+        result = loadtest.report(stats)
+        result['options'] = {
+            name: options[name]
+            for name in ('workers', 'clients', 'scenarios', 'seed')
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(result, output, indent=2, sort_keys=True,
+                      ensure_ascii=False)
+            output.write('\n')
+        total = result['total']
+        self.stdout.write(
+            f'запросов: {total["requests"]}, в секунду: {total["rps"]}, '
+            f'p99: {total["latency_ms"]["p99"]} мс, '
+            f'ошибок: {total["error_rate"]:.2%}; отчёт в {options["output"]}'
+        )
@@ -0,0 +1,50 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils.module_loading import autodiscover_modules
+
+from core import tasks
+
+
+def run_in_thread(job):
+    try:
+        return tasks.run(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=2,
+            help='Сколько задач выполнять одновременно',
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза между опросами пустой очереди, в секундах',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить накопившиеся задачи и выйти',
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        worker = tasks.worker_name()
+        concurrency = options['concurrency']
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Одна задача за раз выполняется в основном потоке.
+            run_jobs = pool.map if concurrency > 1 else map
+            while True:
+                tasks.release_stale()
+                jobs = tasks.claim(worker, concurrency)
+                for job, status in zip(jobs, run_jobs(run_in_thread, jobs)):
+                    self.stdout.write(f'{job.name} #{job.pk}: {status}')
+                if not jobs:
+                    if options['once']:
+                        return
+                    time.sleep(options['sleep'])
@@ -0,0 +1,129 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils.http import parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .static import BLOCK_SIZE, file_etag, http_date, resolve
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CACHE_CONTROL = 'public, max-age=86400'
+
+
+def single_range(header):
+    """(start, end) из строк одного диапазона байтов или None.
+
+    Несколько диапазонов, другие единицы и ошибки синтаксиса не
+    поддерживаются: такой Range игнорируется, отдаётся весь файл.
+    """
+    match = RANGE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start and end and int(end) < int(start):
+        return None
+    return start, end
+
+
+def parse_range(start, end, size):
+    """(start, end) в байтах файла; None, если диапазон за его концом."""
+    if not start:
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return None
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def not_modified(request, etag, mtime):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in if_none_match or if_none_match.strip() == '*'
+    since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+    )
+    return since is not None and int(mtime) <= since
+
+
+def range_applies(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def accelerated_response(path, content_type):
+    """Отдачу файла берёт на себя nginx или Apache."""
+    response = HttpResponse(content_type=content_type)
+    header = settings.MEDIA_ACCEL_HEADER
+    if header == 'X-Accel-Redirect':
+        relative = os.path.relpath(path, os.path.realpath(settings.MEDIA_ROOT))
+        response[header] = settings.MEDIA_ACCEL_PREFIX + relative
+    else:
+        response[header] = path
+    return response
+
+
+def file_response(request, path, stat, etag, content_type):
+    range_header = request.META.get('HTTP_RANGE')
+    requested = single_range(range_header) if range_header else None
+    if not requested or not range_applies(request, etag, stat.st_mtime):
+        # FileResponse отдаёт файл через wsgi.file_wrapper, то есть sendfile.
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        response['Content-Length'] = stat.st_size
+        return response
+    byte_range = parse_range(*requested, stat.st_size)
+    if byte_range is None:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(
+        read_range(path, start, length), status=206, content_type=content_type
+    )
+    response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+    response['Content-Length'] = length
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    full_path = resolve(settings.MEDIA_ROOT, path)
+    if full_path is None or not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    etag = file_etag(stat)
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    elif settings.MEDIA_ACCEL_HEADER:
+        response = accelerated_response(full_path, content_type)
+    else:
+        response = file_response(request, full_path, stat, etag, content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = CACHE_CONTROL
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -0,0 +1,95 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+from wsgiref.util import FileWrapper
+
+# Имена вида style.1a2b3c4d5e6f.css, которые даёт ManifestStaticFilesStorage.
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+BLOCK_SIZE = 64 * 1024
+
+
+def file_etag(stat):
+    return '"{:x}-{:x}"'.format(int(stat.st_mtime), stat.st_size)
+
+
+def http_date(timestamp):
+    return formatdate(timestamp, usegmt=True)
+
+
+def accepted_encodings(header):
+    encodings = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00'):
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+def resolve(root, relative_path):
+    """Путь внутри root или None, если запрос пытается выйти за его пределы."""
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, relative_path.lstrip('/')))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+class StaticFilesMiddleware:
+    """WSGI-обёртка, раздающая STATIC_ROOT мимо Django.
+
+    Тело ответа отдаётся через wsgi.file_wrapper, который gunicorn и uWSGI
+    превращают в sendfile(), так что воркер не копирует байты сам.
+    """
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.root = root
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path_info = environ.get('PATH_INFO', '')
+        if (
+            not self.root
+            or not path_info.startswith(self.prefix)
+            or environ['REQUEST_METHOD'] not in ('GET', 'HEAD')
+        ):
+            return self.application(environ, start_response)
+        path = resolve(self.root, path_info[len(self.prefix):])
+        if path is None or not os.path.isfile(path):
+            return self.application(environ, start_response)
+        return self.serve(path, environ, start_response)
+
+    def serve(self, path, environ, start_response):
+        content_type, _ = mimetypes.guess_type(path)
+        headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Vary', 'Accept-Encoding'),
+            ('Cache-Control', (
+                IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+            )),
+        ]
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and os.path.isfile(path + suffix):
+                path += suffix
+                headers.append(('Content-Encoding', encoding))
+                break
+        stat = os.stat(path)
+        etag = file_etag(stat)
+        headers += [
+            ('ETag', etag),
+            ('Last-Modified', http_date(stat.st_mtime)),
+        ]
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers)
+            return []
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), BLOCK_SIZE)
@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.txt', '.html', '.json', '.xml', '.ico', '.map',
+)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Манифест с хешами в именах плюс .gz и .br рядом с каждым файлом.
+
+    Если collectstatic ещё не запускался (манифеста нет) или включён
+    DEBUG, отдаёт ссылки без хеша вместо ошибки при рендеринге шаблона.
+    Файл, которого нет в существующем манифесте, — ошибка выкладки.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if settings.DEBUG or not self.exists(self.manifest_name):
+                return name
+            raise
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as source:
+            content = source.read()
+        variants = [('.gz', gzip.compress(content, 9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(content) * 0.95:
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под хешем их содержимого.
+
+    Одинаковые загрузки превращаются в один файл posts/ab/cd/<sha256>.jpg,
+    поэтому и миниатюры для него строятся один раз. Сколько записей
+    ссылается на файл, считает core.models.StoredFile.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        return posixpath.join(
+            posixpath.dirname(name.replace('\\', '/')),
+            digest[:2],
+            digest[2:4],
+            digest + extension,
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Ссылка появится, только когда сохранится запись с файлом;
+            # до тех пор gc_images не тронет недавно изменённый счётчик.
+            add_reference(name, 0)
+            if self.exists(name):
+                return name
+        return self._save(name, content)
+
+
+def add_reference(name, delta):
+    from .models import StoredFile
+
+    if not name:
+        return
+    updated = StoredFile.objects.filter(name=name).update(
+        refcount=F('refcount') + delta, updated=timezone.now()
+    )
+    if not updated:
+        try:
+            with transaction.atomic():
+                StoredFile.objects.create(name=name, refcount=delta)
+        except IntegrityError:
+            add_reference(name, delta)
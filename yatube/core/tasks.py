@@ -0,0 +1,95 @@
+import json
+import os
+import socket
+import traceback
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .db import retry_on_busy
+from .models import Task
+
+RETRY_DELAY = timedelta(seconds=10)
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+
+def task(func=None, max_attempts=5):
+    """Регистрирует функцию как фоновую задачу и добавляет ей .delay()."""
+    if func is None:
+        return lambda func: task(func, max_attempts=max_attempts)
+    name = f'{func.__module__}.{func.__name__}'
+
+    @wraps(func)
+    def delay(*args, **kwargs):
+        return enqueue(name, *args, max_attempts=max_attempts, **kwargs)
+
+    func.task_name = name
+    func.delay = delay
+    return func
+
+
+def enqueue(name, *args, max_attempts=5, run_at=None, **kwargs):
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        return import_string(name)(*args, **kwargs)
+    return Task.objects.create(
+        name=name,
+        payload=json.dumps({'args': args, 'kwargs': kwargs}),
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def release_stale(timeout=LOCK_TIMEOUT):
+    """Возвращает в очередь задачи упавших обработчиков."""
+    return Task.objects.filter(
+        status=Task.RUNNING,
+        locked_at__lt=timezone.now() - timeout,
+    ).update(status=Task.PENDING, locked_by='', locked_at=None)
+
+
+@retry_on_busy
+def claim(worker, limit):
+    """Забирает задачи условным UPDATE, так что обработчики не пересекаются."""
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now
+    ).values_list('pk', flat=True)[:limit]
+    claimed = [
+        pk for pk in candidates
+        if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING,
+            locked_by=worker,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def run(job):
+    try:
+        payload = json.loads(job.payload)
+        import_string(job.name)(*payload['args'], **payload['kwargs'])
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Task.PENDING
+            job.run_at = timezone.now() + RETRY_DELAY * 2 ** job.attempts
+        else:
+            job.status = Task.FAILED
+    else:
+        job.status = Task.DONE
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=(
+        'status', 'run_at', 'last_error', 'locked_by', 'locked_at',
+    ))
+    return job.status
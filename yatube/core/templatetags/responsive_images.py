@@ -0,0 +1,20 @@
+import logging
+
+from django import template
+
+from core.images import responsive_variants
+
+register = template.Library()
+logger = logging.getLogger(__name__)
+
+
+@register.inclusion_tag('includes/picture.html')
+def responsive_image(image, css_class='card-img my-2'):
+    variants = None
+    if image:
+        try:
+            variants = responsive_variants(image)
+        except Exception:
+            # Как и {% thumbnail %}, битая картинка не должна ронять страницу.
+            logger.exception('Не удалось построить миниатюры %s', image)
+    return {'variants': variants, 'css_class': css_class}
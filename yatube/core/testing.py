@@ -0,0 +1,59 @@
+"""Окружение тестов: свой кеш вместо общего кеша сайта на диске."""
+import shutil
+import tempfile
+
+from django.apps import apps
+from django.db.models.signals import post_migrate
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+
+def clear_cache(**kwargs):
+    """flush в TransactionTestCase выдаёт id заново: карточки и реестр
+    групп прошлых тестов ссылались бы на чужие строки."""
+    from django.core.cache import cache
+    cache.clear()
+
+
+class IsolatedCache:
+    """Кеш в отдельном временном каталоге на время тестов.
+
+    Файловый, как и кеш сайта: тесты проверяют, что соседние процессы
+    видят записи друг друга.
+    """
+
+    def __init__(self):
+        self.location = tempfile.mkdtemp(prefix='yatube-cache-')
+        self.settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': FILE_CACHE,
+                'LOCATION': self.location,
+                'OPTIONS': {'MAX_ENTRIES': 20000},
+            }
+        })
+
+    def enable(self):
+        self.settings.enable()
+        post_migrate.connect(
+            clear_cache,
+            sender=apps.get_app_config('core'),
+            dispatch_uid='core.testing.clear_cache',
+        )
+
+    def disable(self):
+        post_migrate.disconnect(dispatch_uid='core.testing.clear_cache')
+        self.settings.disable()
+        shutil.rmtree(self.location, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.isolated_cache = IsolatedCache()
+        self.isolated_cache.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated_cache.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,55 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db import retry_on_busy
+
+
+class SqliteSettingsTests(TestCase):
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из core.db."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_benchmark_reports_both_modes(self):
+        """Бенчмарк сравнивает настройки по умолчанию и WAL."""
+        out = StringIO()
+        call_command(
+            'bench_sqlite', seconds=0.2, writers=2, readers=2, stdout=out
+        )
+        self.assertIn('по умолчанию', out.getvalue())
+        self.assertIn('WAL', out.getvalue())
+
+
+@mock.patch('core.db.time.sleep')
+class RetryOnBusyTests(SimpleTestCase):
+    def test_retries_locked_database(self, sleep):
+        """Блокировка базы повторяется, пока попытки не кончатся."""
+        func = mock.Mock(side_effect=[
+            OperationalError('database is locked'),
+            OperationalError('database is locked'),
+            'готово',
+        ])
+        self.assertEqual(retry_on_busy(func)(), 'готово')
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_gives_up(self, sleep):
+        """После последней попытки ошибка пробрасывается."""
+        func = mock.Mock(side_effect=OperationalError('database is locked'))
+        with self.assertRaises(OperationalError):
+            retry_on_busy(func, attempts=3)()
+        self.assertEqual(func.call_count, 3)
+
+    def test_other_errors_are_not_retried(self, sleep):
+        """Прочие ошибки базы не повторяются."""
+        func = mock.Mock(side_effect=OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            retry_on_busy(func)()
+        self.assertEqual(func.call_count, 1)
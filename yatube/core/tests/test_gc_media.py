@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.functional import empty
+from sorl.thumbnail import default, get_thumbnail
+
+from core.models import StoredFile
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageCollectorTests(TestCase):
+    def setUp(self):
+        # Хранилище миниатюр создаётся один раз, а MEDIA_ROOT подменён;
+        # кэш sorl переживает откат транзакции между тестами.
+        default.storage._wrapped = empty
+        cache.clear()
+        self.addCleanup(setattr, default.storage, '_wrapped', empty)
+        user = User.objects.create_user(username='author')
+        self.post = Post.objects.create(
+            author=user,
+            text='Пост',
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.thumbnail = get_thumbnail(self.post.image, '100x100')
+        self.orphan = self.write('posts/orphan.jpg', b'x' * 10)
+        self.stray = self.write('cache/zz/zz/stray.jpg', b'y' * 20)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(TEMP_MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+        return path
+
+    def collect(self, **options):
+        out = StringIO()
+        call_command('gc_media', min_age=-60, stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run_only_reports(self):
+        """Пробный запуск ничего не удаляет, но считает байты."""
+        output = self.collect(dry_run=True)
+        self.assertIn('posts/orphan.jpg', output)
+        self.assertIn('cache/zz/zz/stray.jpg', output)
+        self.assertIn('освобождено байт: 30', output)
+        self.assertTrue(os.path.exists(self.orphan))
+
+    def test_keeps_recently_stored_file(self):
+        """Старый файл, только что загруженный повторно, не удаляется."""
+        reused = self.write('posts/reused.jpg', b'z' * 10)
+        for path in (self.orphan, reused):
+            os.utime(path, (0, 0))
+        StoredFile.objects.create(
+            name='posts/reused.jpg', refcount=0
+        )
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(os.path.exists(reused))
+        self.assertFalse(os.path.exists(self.orphan))
+
+    def test_removes_only_orphans(self):
+        """Удаляются только файлы без ссылок и неизвестные миниатюры."""
+        self.collect(workers=2)
+        self.assertFalse(os.path.exists(self.orphan))
+        self.assertFalse(os.path.exists(self.stray))
+        self.assertTrue(os.path.exists(self.post.image.path))
+        self.assertTrue(os.path.exists(
+            os.path.join(TEMP_MEDIA_ROOT, self.thumbnail.name)
+        ))
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from core import loadtest
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class ReportTests(SimpleTestCase):
+    def test_summary(self):
+        """Отчёт считает ошибки, ограничения и перцентили по запросам."""
+        stats = loadtest.Stats()
+        for milliseconds in range(1, 101):
+            stats.record('index', 200, milliseconds / 1000)
+        stats.record('add_comment', 429, 0.004)
+        stats.record('add_comment', 500, 0.004)
+        stats.record('add_comment', None, 0.004)
+        stats.record('add_comment', 403, 0.004)
+        stats.record('follow_index', 'login_redirect', 0.004)
+        stats.measure(100, 110)
+        result = loadtest.report(stats)
+        self.assertEqual(result['duration'], 10)
+        self.assertEqual(result['total']['requests'], 105)
+        self.assertEqual(result['total']['rps'], 10.5)
+        self.assertEqual(result['total']['errors'], 4)
+        self.assertEqual(result['requests']['index']['latency_ms']['p90'], 90)
+        comments = result['requests']['add_comment']
+        self.assertEqual(comments['errors'], 3)
+        self.assertEqual(comments['throttled'], 1)
+        self.assertEqual(comments['histogram']['<=5ms'], 4)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='author', password='yatube-password'
+        )
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.create(author=self.author, group=self.group, text='Пост')
+        self.output = os.path.join(tempfile.mkdtemp(), 'report.json')
+        self.addCleanup(os.rmdir, os.path.dirname(self.output))
+        self.addCleanup(os.remove, self.output)
+
+    def test_report_written(self):
+        """Команда прогоняет сценарии и пишет отчёт в JSON."""
+        call_command(
+            'loadtest', url=self.live_server_url, clients=2, duration=0.5,
+            scenarios='browse,follow', output=self.output, stdout=StringIO(),
+        )
+        with open(self.output) as report:
+            result = json.load(report)
+        self.assertGreater(result['total']['requests'], 0)
+        self.assertEqual(result['total']['errors'], 0)
+        self.assertIn('post_detail', result['requests'])
+        self.assertEqual(
+            result['requests']['follow_index']['statuses'], {
+                '200': result['requests']['follow_index']['requests'],
+            }
+        )
+
+
+class ClientTests(LiveServerTestCase):
+    def setUp(self):
+        User.objects.create_user(username='author', password='password')
+
+    def test_failed_login_counted_as_errors(self):
+        """Неудачный вход и редирект на вход в сценарии — ошибки."""
+        stats = loadtest.Stats()
+        client = loadtest.Client(self.live_server_url, stats)
+        client.login('author', 'wrong-password')
+        client.requires_login = True
+        loadtest.follow_feed(client, None, {})
+        self.assertEqual(dict(stats.statuses['login']), {'login_failed': 1})
+        self.assertEqual(
+            dict(stats.statuses['follow_index']), {'login_redirect': 3}
+        )
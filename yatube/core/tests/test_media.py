@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 40
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServingTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'a.jpg'), 'wb') as f:
+            f.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с ETag и Last-Modified."""
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertTrue(response['ETag'])
+        self.assertTrue(response['Last-Modified'])
+
+    def test_conditional_requests(self):
+        """If-None-Match и If-Modified-Since дают 304."""
+        response = self.client.get('/media/posts/a.jpg')
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ):
+            with self.subTest(header=header):
+                repeated = self.client.get(
+                    '/media/posts/a.jpg', **{header: value}
+                )
+                self.assertEqual(repeated.status_code, 304)
+
+    def test_range_requests(self):
+        """Поддерживаются диапазоны байтов, в том числе с конца файла."""
+        size = len(CONTENT)
+        cases = {
+            'bytes=0-9': (CONTENT[:10], f'bytes 0-9/{size}'),
+            'bytes=100-': (CONTENT[100:], f'bytes 100-{size - 1}/{size}'),
+            'bytes=-5': (CONTENT[-5:], f'bytes {size - 5}-{size - 1}/{size}'),
+        }
+        for header, (body, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.client.get(
+                    '/media/posts/a.jpg', HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(b''.join(response.streaming_content), body)
+                self.assertEqual(response['Content-Range'], content_range)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(
+            '/media/posts/a.jpg', HTTP_RANGE=f'bytes={len(CONTENT)}-'
+        )
+        self.assertEqual(response.status_code, 416)
+
+    def test_unsupported_range_ignored(self):
+        """Несколько диапазонов или другие единицы — весь файл, не 416."""
+        for header in ('bytes=0-1,4-5', 'items=0-3', 'bytes=9-2'):
+            with self.subTest(range=header):
+                response = self.client.get(
+                    '/media/posts/a.jpg', HTTP_RANGE=header
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    b''.join(response.streaming_content), CONTENT
+                )
+
+    def test_stale_if_range_returns_full_file(self):
+        """Устаревший If-Range отдаёт файл целиком."""
+        response = self.client.get(
+            '/media/posts/a.jpg', HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"x"'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_path_outside_media_root(self):
+        response = self.client.get('/media/../settings.py')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        """За nginx отдача файла передаётся через X-Accel-Redirect."""
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/a.jpg'
+        )
+        self.assertEqual(response.content, b'')
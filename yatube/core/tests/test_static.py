@@ -0,0 +1,98 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from ..static import IMMUTABLE, StaticFilesMiddleware
+
+CSS = b'body { color: red; }\n' * 100
+
+
+def fallback_app(environ, start_response):
+    start_response('404 Not Found', [])
+    return [b'django']
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'wb') as f:
+            f.write(CSS)
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        with self.settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        ):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            self.hashed = staticfiles_storage.stored_name('css/site.css')
+        self.app = StaticFilesMiddleware(fallback_app, self.root, '/static/')
+
+    def request(self, path, **environ):
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': path, **environ}
+        body = b''.join(self.app(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic кладёт файл с хешем и его gzip-версию."""
+        self.assertNotEqual(self.hashed, 'css/site.css')
+        with open(os.path.join(self.root, self.hashed + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), CSS)
+
+    def test_hashed_file_is_immutable_and_compressed(self):
+        """Файл с хешем отдаётся сжатым и кешируется навсегда."""
+        status, headers, body = self.request(
+            '/static/' + self.hashed, HTTP_ACCEPT_ENCODING='gzip, deflate'
+        )
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), CSS)
+
+    def test_etag_revalidation(self):
+        """Повторный запрос с ETag получает 304 без тела."""
+        _, headers, _ = self.request('/static/' + self.hashed)
+        status, _, body = self.request(
+            '/static/' + self.hashed, HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual(status, '304 Not Modified')
+        self.assertEqual(body, b'')
+
+    def test_unknown_and_escaping_paths_go_to_django(self):
+        """Чужие пути и попытки выйти из STATIC_ROOT уходят в Django."""
+        for path in ('/static/missing.css', '/static/../etc/passwd', '/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.request(path)[2], b'django')
+
+    @override_settings(STATIC_ROOT='/nonexistent')
+    def test_missing_manifest_falls_back_to_plain_names(self):
+        """Без collectstatic шаблоны получают ссылки без хеша."""
+        self.assertEqual(
+            staticfiles_storage.url('css/bootstrap.min.css'),
+            settings.STATIC_URL + 'css/bootstrap.min.css',
+        )
+
+    def test_missing_manifest_entry_raises(self):
+        """Файла нет в собранном манифесте — ошибка, а не ссылка без хеша."""
+        with self.settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        ):
+            with self.assertRaises(ValueError):
+                staticfiles_storage.stored_name('css/missing.css')
+            with self.settings(DEBUG=True):
+                self.assertEqual(
+                    staticfiles_storage.stored_name('css/missing.css'),
+                    'css/missing.css',
+                )
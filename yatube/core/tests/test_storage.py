@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from posts.models import Post
+
+from ..models import StoredFile
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name, content=SMALL_GIF):
+    return SimpleUploadedFile(name, content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def refcount(self, name):
+        return StoredFile.objects.get(name=name).refcount
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые загрузки дают один файл с двумя ссылками."""
+        first = Post.objects.create(
+            author=self.user, text='Раз', image=upload('a.gif')
+        )
+        second = Post.objects.create(
+            author=self.user, text='Два', image=upload('b.gif')
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith('posts/'))
+        self.assertEqual(self.refcount(first.image.name), 2)
+
+    def test_edit_and_delete_release_references(self):
+        """Замена картинки и удаление поста уменьшают счётчик."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=upload('a.gif')
+        )
+        old_name = post.image.name
+        post = Post.objects.get(pk=post.pk)
+        post.image = upload('c.gif', SMALL_GIF + b'\x00')
+        post.save()
+        self.assertEqual(self.refcount(old_name), 0)
+        self.assertEqual(self.refcount(post.image.name), 1)
+        Post.objects.get(pk=post.pk).delete()
+        self.assertEqual(self.refcount(post.image.name), 0)
+
+    def test_gc_removes_unreferenced_files(self):
+        """Сборщик удаляет только файлы без ссылок."""
+        kept = Post.objects.create(
+            author=self.user, text='Оставить', image=upload('a.gif')
+        )
+        dropped = Post.objects.create(
+            author=self.user,
+            text='Удалить',
+            image=upload('d.gif', SMALL_GIF + b'\x01'),
+        )
+        dropped_name = dropped.image.name
+        dropped.delete()
+        call_command('gc_images', grace_minutes=-1, stdout=StringIO())
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, dropped_name))
+        )
+        self.assertTrue(os.path.exists(kept.image.path))
+        self.assertFalse(StoredFile.objects.filter(name=dropped_name).exists())
+
+    def test_gc_keeps_file_returned_by_save(self):
+        """Повторная загрузка файла без ссылок защищает его от сборщика."""
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=upload('e.gif')
+        )
+        name = post.image.name
+        post.delete()
+        StoredFile.objects.filter(name=name).update(
+            updated=timezone.now() - timedelta(days=1)
+        )
+        storage = Post._meta.get_field('image').storage
+        self.assertEqual(storage.save('posts/f.gif', upload('f.gif')), name)
+        call_command('gc_images', stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
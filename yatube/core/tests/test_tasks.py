@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import tasks
+from ..models import Task
+
+CALLS = []
+
+
+@tasks.task
+def remember(value):
+    CALLS.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_enqueues_task(self):
+        """delay() кладёт задачу в очередь, а не выполняет её."""
+        remember.delay(1)
+        self.assertEqual(CALLS, [])
+        job = Task.objects.get()
+        self.assertEqual(job.name, remember.task_name)
+        self.assertEqual(job.status, Task.PENDING)
+
+    def test_worker_runs_pending_tasks(self):
+        """Обработчик выполняет задачи и отмечает их выполненными."""
+        remember.delay(1)
+        remember.delay(2)
+        call_command(
+            'run_tasks', once=True, concurrency=1, stdout=StringIO()
+        )
+        self.assertEqual(sorted(CALLS), [1, 2])
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+    def test_claim_is_exclusive(self):
+        """Одну задачу не могут забрать два обработчика."""
+        remember.delay(1)
+        self.assertEqual(len(tasks.claim('first', 10)), 1)
+        self.assertEqual(tasks.claim('second', 10), [])
+
+    def test_failed_task_is_retried_then_failed(self):
+        """Упавшая задача повторяется с задержкой, затем помечается ошибкой."""
+        explode.delay()
+        job, = tasks.claim('worker', 1)
+        self.assertEqual(tasks.run(job), Task.PENDING)
+        self.assertGreater(job.run_at, timezone.now())
+        Task.objects.update(run_at=timezone.now())
+        job, = tasks.claim('worker', 1)
+        self.assertEqual(tasks.run(job), Task.FAILED)
+        self.assertIn('boom', job.last_error)
+
+    def test_stale_tasks_are_released(self):
+        """Задачи зависшего обработчика возвращаются в очередь."""
+        remember.delay(1)
+        tasks.claim('dead', 1)
+        Task.objects.update(locked_at=timezone.now() - tasks.LOCK_TIMEOUT * 2)
+        self.assertEqual(tasks.release_stale(), 1)
+        self.assertEqual(Task.objects.get().status, Task.PENDING)
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        """В режиме TASKS_ALWAYS_EAGER задача выполняется сразу."""
+        remember.delay(3)
+        self.assertEqual(CALLS, [3])
+        self.assertFalse(Task.objects.exists())
@@ -1,9 +1,116 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+
+from . import moderation, shards
 from .models import Post, Group
+from .search import fts_available, search_posts
+
+# Ниже этого порога оценка из статистики СУБД заменяется точным COUNT(*).
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+
+def estimated_count(model, using='default'):
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql = 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1'
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None:
+        return None
+    return int(str(row[0]).split()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Для таблицы без фильтров берёт число строк из статистики СУБД."""
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model, queryset.db)
+            if estimate is not None and (
+                estimate >= ESTIMATED_COUNT_THRESHOLD
+            ):
+                return estimate
+        return super().count
+
+
+class GroupActionForm(ActionForm):
+    # Поле id с поиском во всплывающем окне: список всех групп в <select>
+    # выбирался бы запросом на каждой странице списка.
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа (пусто — без группы)',
+        widget=ForeignKeyRawIdWidget(
+            Post._meta.get_field('group').remote_field, admin.site
+        ),
+    )
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """Выбор базы постов: список собирается из одной базы за раз.
+
+    Саму базу выбирает PostAdmin.get_queryset; фильтр только показывает
+    варианты и забирает параметр из адреса.
+    """
+
+    title = 'База'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in shards.hot_aliases()]
+
+    def choices(self, changelist):
+        # Пункта «Все» нет: без параметра показывается первая база.
+        for choice in list(super().choices(changelist))[1:]:
+            yield choice
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class ModerationMixin:
+    action_form = GroupActionForm
+
+    def moderate(self, request, operation, querysets, *args):
+        total, queued = moderation.run_in_batches(
+            operation, querysets, *args
+        )
+        if queued:
+            self.message_user(request, format_html(
+                'Постов: {}. Поставлено задач в очередь: {}, '
+                'ход выполнения — в разделе <a href="{}">Задачи</a>.',
+                total,
+                queued,
+                reverse('admin:core_task_changelist')
+                + f'?name={operation.task_name}',
+            ))
+        else:
+            self.message_user(request, f'Обработано постов: {total}.')
+
+    def target_group_id(self, request):
+        return request.POST.get('group') or None
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ModerationMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,13 +119,110 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
+    actions = (
+        'reassign_group',
+        'delete_in_batches',
+        'delete_by_author',
+        'purge_comments',
+    )
+
+    # С шардами список постов собирается из одной базы, выбранной
+    # фильтром ShardFilter, а JOIN с авторами и группами невозможен.
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if shards.enabled():
+            aliases = shards.hot_aliases()
+            alias = request.GET.get(ShardFilter.parameter_name)
+            queryset = queryset.using(
+                alias if alias in aliases else aliases[0]
+            )
+        return queryset
+
+    def get_object(self, request, object_id, from_field=None):
+        if not shards.enabled():
+            return super().get_object(request, object_id, from_field)
+        try:
+            queryset = shards.for_post(
+                super().get_queryset(request), object_id
+            )
+        except ValueError:
+            return None
+        return queryset.filter(pk=object_id).first()
+
+    def get_list_filter(self, request):
+        if shards.enabled():
+            return (ShardFilter,) + self.list_filter
+        return self.list_filter
+
+    def get_list_select_related(self, request):
+        return () if shards.enabled() else self.list_select_related
+
+    # Collector искал бы уведомления в шарде, где их таблицы нет.
+
+    def get_deleted_objects(self, objs, request):
+        if not shards.enabled():
+            return super().get_deleted_objects(objs, request)
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {Post._meta.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        if not shards.enabled():
+            return super().delete_model(request, obj)
+        moderation.delete_posts([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        if not shards.enabled():
+            return super().delete_queryset(request, queryset)
+        moderation.delete_posts(list(queryset.values_list('pk', flat=True)))
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term and fts_available(queryset.db):
+            return search_posts(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def reassign_group(self, request, queryset):
+        self.moderate(
+            request,
+            moderation.reassign_group,
+            [queryset],
+            self.target_group_id(request),
+        )
+    reassign_group.short_description = 'Перенести в выбранную группу'
+
+    def delete_in_batches(self, request, queryset):
+        self.moderate(request, moderation.delete_posts, [queryset])
+    delete_in_batches.short_description = 'Удалить выбранные посты пачками'
+
+    def delete_by_author(self, request, queryset):
+        author_ids = set(queryset.values_list('author_id', flat=True))
+        self.moderate(request, moderation.delete_posts, shards.across(
+            Post.objects.filter(author_id__in=author_ids),
+            author_ids=author_ids,
+        ))
+    delete_by_author.short_description = 'Удалить все посты этих авторов'
+
+    def purge_comments(self, request, queryset):
+        self.moderate(request, moderation.purge_comments, [queryset])
+    purge_comments.short_description = 'Удалить комментарии к постам'
 
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(ModerationMixin, admin.ModelAdmin):
     list_display = (
         'pk',
         'title',
@@ -27,3 +231,27 @@ class GroupAdmin(admin.ModelAdmin):
     )
     search_fields = ('title',)
     empty_value_display = '-пусто-'
+    actions = ('move_posts', 'purge_comments')
+
+    def group_posts(self, queryset):
+        # Посты могут лежать в шардах: JOIN с группами там невозможен.
+        return shards.across(Post.objects.filter(
+            group_id__in=list(queryset.values_list('pk', flat=True))
+        ))
+
+    def move_posts(self, request, queryset):
+        self.moderate(
+            request,
+            moderation.reassign_group,
+            self.group_posts(queryset),
+            self.target_group_id(request),
+        )
+    move_posts.short_description = 'Перенести посты в выбранную группу'
+
+    def purge_comments(self, request, queryset):
+        self.moderate(
+            request,
+            moderation.purge_comments,
+            self.group_posts(queryset),
+        )
+    purge_comments.short_description = 'Удалить комментарии к постам групп'
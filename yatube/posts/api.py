@@ -0,0 +1,192 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, urlencode
+from django.views.decorators.http import require_safe
+
+from . import shards
+from .caches import (attach_authors, attach_groups, get_author_or_404,
+                     get_group_or_404)
+from .cursors import InvalidCursor, after_cursor, encode_cursor
+from .models import Post
+from .views import followed_posts
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
+
+# Поле ответа -> колонки values(); вложенные объекты берутся через JOIN.
+FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'image': ('image',),
+    'author': (
+        'author__id',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+    ),
+    'group': ('group__id', 'group__slug', 'group__title'),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(
+        data, cls=DjangoJSONEncoder, ensure_ascii=False
+    ).encode()
+
+
+def json_response(request, data, status=200):
+    content = dumps(data)
+    response = HttpResponse(
+        content, status=status, content_type='application/json'
+    )
+    if status == 200:
+        etag = quote_etag(hashlib.md5(content).hexdigest())
+        response['ETag'] = etag
+        response = get_conditional_response(
+            request, etag=etag, response=response
+        ) or response
+    return response
+
+
+def requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return list(FIELDS)
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = set(names) - set(FIELDS)
+    if unknown:
+        raise BadRequest(
+            'Неизвестные поля: ' + ', '.join(sorted(unknown))
+        )
+    return names
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    return max(1, min(size, API_MAX_PAGE_SIZE))
+
+
+def serialize(row, fields):
+    item = {}
+    for name in fields:
+        columns = FIELDS[name]
+        if name in ('author', 'group'):
+            nested = {
+                column.split('__', 1)[1]: row[column] for column in columns
+            }
+            item[name] = nested if nested['id'] is not None else None
+        elif name == 'image':
+            item[name] = (
+                settings.MEDIA_URL + row['image'] if row['image'] else None
+            )
+        elif name == 'pub_date':
+            item[name] = row['pub_date'].isoformat()
+        else:
+            item[name] = row[columns[0]]
+    return item
+
+
+def post_row(post):
+    """Строка как из values(): для постов из шардов, где JOIN невозможен.
+
+    Автор и группа должны быть уже подставлены attach_authors и
+    attach_groups.
+    """
+    author, group = post.author, post.group
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'image': post.image.name,
+        'author__id': author.pk,
+        'author__username': author.username,
+        'author__first_name': author.first_name,
+        'author__last_name': author.last_name,
+        'group__id': group.pk if group else None,
+        'group__slug': group.slug if group else None,
+        'group__title': group.title if group else None,
+    }
+
+
+def post_rows(posts):
+    return [
+        post_row(post) for post in attach_authors(attach_groups(list(posts)))
+    ]
+
+
+def feed_response(request, queryset):
+    try:
+        fields = requested_fields(request)
+        size = page_size(request)
+        queryset = after_cursor(queryset, request.GET.get('cursor'))
+    except (BadRequest, InvalidCursor) as error:
+        return json_response(request, {'detail': str(error)}, status=400)
+    # Курсору нужны pub_date и id, даже если клиент их не просил.
+    columns = {'id', 'pub_date'}.union(
+        *(FIELDS[name] for name in fields)
+    )
+    if shards.enabled():
+        rows = post_rows(queryset[:size + 1])
+    else:
+        rows = list(queryset.values(*columns)[:size + 1])
+    next_url = None
+    if len(rows) > size:
+        rows = rows[:size]
+        query = request.GET.copy()
+        query['cursor'] = encode_cursor(rows[-1]['pub_date'], rows[-1]['id'])
+        next_url = request.build_absolute_uri(
+            request.path + '?' + urlencode(query, doseq=True)
+        )
+    return json_response(request, {
+        'results': [serialize(row, fields) for row in rows],
+        'next': next_url,
+    })
+
+
+@require_safe
+def index(request):
+    return feed_response(request, shards.scatter(Post.objects.all()))
+
+
+@require_safe
+def group_posts(request, slug):
+    return feed_response(
+        request, shards.scatter(get_group_or_404(slug).posts.all())
+    )
+
+
+@require_safe
+def profile(request, username):
+    author = get_author_or_404(username)
+    return feed_response(
+        request, shards.scatter(Post.objects.all(), author_ids=[author.pk])
+    )
+
+
+@require_safe
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return json_response(
+            request, {'detail': 'Требуется авторизация'}, status=401
+        )
+    return feed_response(request, followed_posts(request.user))
@@ -0,0 +1,128 @@
+"""Архив старых постов: горячая таблица Post остаётся небольшой.
+
+Команда archive_posts переносит посты старше порога вместе с
+комментариями в ArchivedPost и ArchivedComment, сохраняя id. Страница
+поста и профиль ищут сначала в горячей таблице, затем в архиве.
+"""
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+
+from core.db import retry_on_busy
+
+from . import shards
+from .models import (ArchivedComment, ArchivedPost, Comment, Notification,
+                     Post)
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH = 1000
+POST_COLUMNS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image')
+COMMENT_COLUMNS = ('post_id', 'author_id', 'text', 'created')
+
+
+def old_posts(alias, cutoff):
+    return Post.objects.using(alias).filter(pub_date__lt=cutoff)
+
+
+@retry_on_busy
+def archive_batch(alias, cutoff, batch_size=ARCHIVE_BATCH):
+    """Переносит до batch_size постов шарда alias; возвращает (посты,
+    комментарии)."""
+    with transaction.atomic(), transaction.atomic(using=alias):
+        posts = list(old_posts(alias, cutoff).order_by('pk').values(
+            *POST_COLUMNS
+        )[:batch_size])
+        if not posts:
+            return 0, 0
+        ids = [post['id'] for post in posts]
+        comments = Comment.objects.using(alias).filter(post_id__in=ids)
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**post) for post in posts
+        )
+        archived_comments = ArchivedComment.objects.bulk_create(
+            ArchivedComment(**comment)
+            for comment in comments.order_by('pk').values(*COMMENT_COLUMNS)
+        )
+        Notification.objects.filter(post_id__in=ids).delete()
+        comments.delete()
+        # Без Collector: уведомления уже удалены, а в шарде их таблицы
+        # нет. Ссылка на картинку переходит к архивной копии, поэтому
+        # счётчик StoredFile не меняется.
+        Post.objects.using(alias).filter(pk__in=ids)._raw_delete(alias)
+    return len(posts), len(archived_comments)
+
+
+def get_post_or_404(post_id):
+    """Пост из горячей таблицы, а если его там нет — из архива."""
+    post = shards.for_post(Post.objects, post_id).filter(pk=post_id).first()
+    if post is None:
+        post = get_object_or_404(ArchivedPost, pk=post_id)
+    return post
+
+
+class Chain:
+    """Горячие посты, за ними архивные: архив всегда старше.
+
+    Как и Scatter, поддерживает то, что нужно Paginator и after_cursor.
+    Количество строк частей считается, только если срез их пропускает.
+    """
+
+    ordered = True
+
+    def __init__(self, *parts):
+        self.parts = parts
+        self._counts = {}
+
+    def _clone(self, method, *args, **kwargs):
+        return Chain(*(
+            getattr(part, method)(*args, **kwargs) for part in self.parts
+        ))
+
+    def filter(self, *args, **kwargs):
+        return self._clone('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._clone('exclude', *args, **kwargs)
+
+    def order_by(self, *fields):
+        return self._clone('order_by', *fields)
+
+    def _count(self, index):
+        if index not in self._counts:
+            self._counts[index] = self.parts[index].count()
+        return self._counts[index]
+
+    def count(self):
+        return sum(self._count(index) for index in range(len(self.parts)))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        result = []
+        for index, part in enumerate(self.parts):
+            if stop is not None and stop <= start:
+                break
+            if start:
+                size = self._count(index)
+                if start >= size:
+                    start -= size
+                    stop = None if stop is None else stop - size
+                    continue
+            rows = list(part[start:stop])
+            result += rows
+            stop = None if stop is None else stop - start - len(rows)
+            start = 0
+        return result
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def author_posts(author):
+    return Chain(
+        shards.scatter(Post.objects.all(), author_ids=[author.pk]),
+        author.archived_posts.all(),
+    )
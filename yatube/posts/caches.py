@@ -0,0 +1,201 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+
+from . import shards
+from .models import ArchivedPost, Follow, Group, Post
+
+User = get_user_model()
+
+GROUPS_KEY = 'posts:groups'
+GROUPS_GENERATION_KEY = 'posts:groups:generation'
+
+AUTHOR_CARD_TIMEOUT = 60 * 15
+AUTHOR_CARD_FIELDS = (
+    'id',
+    'username',
+    'first_name',
+    'last_name',
+    'posts_count',
+    'followers_count',
+)
+
+GROUPS_TIMEOUT = 60 * 15
+
+# Копия реестра групп в памяти процесса:
+# (поколение, {id: Group}, {slug: Group}).
+_local_groups = (None, {}, {})
+
+
+def _generation():
+    generation = cache.get(GROUPS_GENERATION_KEY)
+    if generation is None:
+        cache.add(GROUPS_GENERATION_KEY, uuid.uuid4().hex, GROUPS_TIMEOUT)
+        generation = cache.get(GROUPS_GENERATION_KEY)
+    return generation
+
+
+def _load_groups(generation):
+    by_id = {group.pk: group for group in Group.objects.all()}
+    registry = (
+        generation, by_id, {group.slug: group for group in by_id.values()}
+    )
+    # Пока группы читались из базы, forget_groups() мог сменить
+    # поколение: тогда прочитанная копия уже устарела и не пишется.
+    if cache.get(GROUPS_GENERATION_KEY) == generation:
+        cache.set(GROUPS_KEY, registry, GROUPS_TIMEOUT)
+    return registry
+
+
+def _registry():
+    global _local_groups
+    generation = _generation()
+    if generation is None or generation != _local_groups[0]:
+        shared = cache.get(GROUPS_KEY)
+        if shared is None or shared[0] != generation:
+            shared = _load_groups(generation)
+        _local_groups = shared
+    return _local_groups
+
+
+def groups():
+    """Все группы {id: Group} из памяти процесса или общего кеша."""
+    return _registry()[1]
+
+
+def forget_groups():
+    cache.set(GROUPS_GENERATION_KEY, uuid.uuid4().hex, GROUPS_TIMEOUT)
+
+
+def get_group(pk):
+    return groups().get(pk)
+
+
+def get_group_or_404(slug):
+    group = _registry()[2].get(slug)
+    if group is not None:
+        return group
+    # Группа могла появиться в другом процессе до сброса кеша.
+    return get_object_or_404(Group, slug=slug)
+
+
+def attach_groups(posts):
+    """Подставляет группы постов из реестра вместо JOIN с posts_group."""
+    registry = groups()
+    for post in posts:
+        group = registry.get(post.group_id)
+        if group is not None:
+            post.group = group
+    return posts
+
+
+def author_card_key(user_id):
+    return f'posts:author:{user_id}'
+
+
+def author_id_key(username):
+    return f'posts:author-id:{username}'
+
+
+def _count(model, field):
+    """Число строк model у автора — отдельным подзапросом.
+
+    Count по нескольким JOIN перемножает строки: у автора с тысячами
+    постов и подписчиков их получаются миллионы.
+    """
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by(
+    ).values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def _load_cards(**filters):
+    users = User.objects.filter(**filters).annotate(
+        followers_count=_count(Follow, 'author'),
+        archived_count=_count(ArchivedPost, 'author'),
+    )
+    if shards.enabled():
+        # Посты в шардах: считаем их там, а не подзапросом в default.
+        cards = {card['id']: card for card in users.values(
+            *AUTHOR_CARD_FIELDS[:-2], 'followers_count', 'archived_count'
+        )}
+        counts = shards.posts_counts(list(cards))
+        for pk, card in cards.items():
+            card['posts_count'] = counts.get(pk, 0)
+    else:
+        cards = {card['id']: card for card in users.annotate(
+            posts_count=_count(Post, 'author'),
+        ).values(*AUTHOR_CARD_FIELDS, 'archived_count')}
+    # Архив переносит посты, а не удаляет: в карточке их общее число.
+    for card in cards.values():
+        card['posts_count'] += card.pop('archived_count')
+    return cards
+
+
+def author_cards(ids):
+    """Карточки авторов {id: dict}; недостающие собираются одним запросом."""
+    keys = {author_card_key(pk): pk for pk in set(ids)}
+    cards = {
+        keys[key]: card for key, card in cache.get_many(keys).items()
+    }
+    missing = [pk for pk in keys.values() if pk not in cards]
+    if missing:
+        loaded = _load_cards(pk__in=missing)
+        cache.set_many({
+            author_card_key(pk): card for pk, card in loaded.items()
+        }, AUTHOR_CARD_TIMEOUT)
+        cards.update(loaded)
+    return cards
+
+
+def forget_author(user_id):
+    cache.delete(author_card_key(user_id))
+
+
+def author_from_card(card):
+    """Экземпляр User только с отображаемыми полями, без запроса к базе."""
+    author = User(
+        id=card['id'],
+        username=card['username'],
+        first_name=card['first_name'],
+        last_name=card['last_name'],
+    )
+    author._state.adding = False
+    author.posts_count = card['posts_count']
+    author.followers_count = card['followers_count']
+    return author
+
+
+def get_author_or_404(username):
+    user_id = cache.get(author_id_key(username))
+    card = author_cards([user_id]).get(user_id) if user_id else None
+    # Пользователя могли переименовать: индекс тогда указывает мимо.
+    if card is None or card['username'] != username:
+        cards = _load_cards(username=username)
+        if not cards:
+            raise Http404('Пользователь не найден')
+        _, card = cards.popitem()
+        cache.set_many({
+            author_card_key(card['id']): card,
+            author_id_key(username): card['id'],
+        }, AUTHOR_CARD_TIMEOUT)
+    return author_from_card(card)
+
+
+def attach_authors(posts):
+    """Подставляет авторов постов из карточек вместо JOIN с auth_user."""
+    authors = {
+        pk: author_from_card(card)
+        for pk, card in author_cards(
+            post.author_id for post in posts
+        ).items()
+    }
+    for post in posts:
+        author = authors.get(post.author_id)
+        if author is not None:
+            post.author = author
+    return posts
@@ -0,0 +1,174 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.db import retry_on_busy
+
+from . import shards, trending
+from .models import Comment, Group, Post
+
+# Не больше COMMENT_RATE_LIMIT комментариев за COMMENT_RATE_WINDOW секунд.
+COMMENT_RATE_LIMIT = 10
+COMMENT_RATE_WINDOW = 60
+# Счётчик меняется под блокировкой в кеше; её ждут RATE_LOCK_ATTEMPTS раз
+# по RATE_LOCK_DELAY секунд.
+RATE_LOCK_TIMEOUT = 5
+RATE_LOCK_ATTEMPTS = 20
+RATE_LOCK_DELAY = 0.005
+
+# Комментарии, пришедшие почти одновременно, записываются одной
+# транзакцией: так единственная блокировка записи SQLite берётся реже.
+COMMENT_BATCH_SIZE = 50
+COMMENT_BATCH_DELAY = 0.02
+
+
+def lock_rate(key):
+    for _ in range(RATE_LOCK_ATTEMPTS):
+        if cache.add(key, 1, RATE_LOCK_TIMEOUT):
+            return True
+        time.sleep(RATE_LOCK_DELAY)
+    return False
+
+
+def rate_limited(user_id):
+    """Считает попытку и отвечает, превышен ли лимит.
+
+    Счётчик в общем кеше: лимит один на все процессы-воркеры. incr
+    файлового кеша — это get и set, он не атомарен и продлевает ключ на
+    срок по умолчанию. Поэтому в значении лежит конец окна, ключ
+    перезаписывается с оставшимся сроком и только под блокировкой.
+    """
+    key = f'posts:comment-rate:{user_id}'
+    lock_key = f'{key}:lock'
+    if not lock_rate(lock_key):
+        # Блокировку держат другие запросы того же пользователя.
+        return True
+    try:
+        now = time.time()
+        expires, count = cache.get(key, (0, 0))
+        if expires <= now:
+            expires, count = now + COMMENT_RATE_WINDOW, 0
+        count += 1
+        cache.set(key, (expires, count), expires - now)
+        return count > COMMENT_RATE_LIMIT
+    finally:
+        cache.delete(lock_key)
+
+
+class Batch:
+    def __init__(self):
+        self.comments = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.errors = {}
+
+
+_lock = threading.Lock()
+_current = None
+_requests = 0
+
+
+def request_started(**kwargs):
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+def request_finished(**kwargs):
+    global _requests
+    with _lock:
+        _requests -= 1
+
+
+def other_requests():
+    """Обрабатывает ли процесс сейчас другие запросы, кроме текущего."""
+    return _requests > 1
+
+
+@retry_on_busy
+def save_comments(comments):
+    """Записывает пачку и начисляет рейтинг, как сигнал post_save."""
+    by_alias = defaultdict(list)
+    for comment in comments:
+        by_alias[shards.post_alias(comment.post_id)].append(comment)
+    with transaction.atomic():
+        for alias, part in by_alias.items():
+            # Без шардов это точка сохранения внутри общей транзакции.
+            with transaction.atomic(using=alias):
+                save_shard_comments(alias, part)
+        for group_id, count in Counter(
+            comment.post.group_id for comment in comments
+            if comment.post.group_id
+        ).items():
+            trending.bump(
+                Group.objects.filter(pk=group_id),
+                trending.COMMENT_WEIGHT * count,
+            )
+
+
+def save_shard_comments(alias, comments):
+    Comment.objects.using(alias).bulk_create(comments)
+    for post_id, count in Counter(
+        comment.post_id for comment in comments
+    ).items():
+        trending.bump(
+            Post.objects.using(alias).filter(pk=post_id),
+            trending.COMMENT_WEIGHT * count,
+        )
+
+
+def submit_comment(comment):
+    """Сохраняет комментарий вместе с соседними и ждёт фиксации.
+
+    Первый запрос пачки ждёт не дольше COMMENT_BATCH_DELAY или до
+    заполнения пачки и записывает её, остальные ждут его результата.
+    Если других запросов в процессе нет, ждать некого и пачка
+    записывается сразу.
+    """
+    global _current
+    with _lock:
+        batch = _current
+        leader = batch is None
+        if leader:
+            batch = _current = Batch()
+        batch.comments.append(comment)
+        if len(batch.comments) >= COMMENT_BATCH_SIZE:
+            _current = None
+            batch.full.set()
+    if leader:
+        if other_requests():
+            batch.full.wait(COMMENT_BATCH_DELAY)
+        with _lock:
+            if _current is batch:
+                _current = None
+        try:
+            write_batch(batch)
+        finally:
+            batch.done.set()
+    else:
+        batch.done.wait()
+    error = batch.errors.get(id(comment))
+    if error is not None:
+        raise error
+
+
+def write_batch(batch):
+    """Пишет пачку; если она не записалась — каждый комментарий отдельно.
+
+    Так ошибка одного комментария достаётся только его запросу.
+    """
+    try:
+        save_comments(batch.comments)
+        return
+    except Exception as error:
+        if len(batch.comments) == 1:
+            batch.errors[id(batch.comments[0])] = error
+            return
+    for comment in batch.comments:
+        try:
+            save_comments([comment])
+        except Exception as error:
+            batch.errors[id(comment)] = error
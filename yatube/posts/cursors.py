@@ -0,0 +1,36 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(pub_date, pk):
+    raw = f'{pub_date.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        pub_date, pk = raw.decode().split('|')
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise InvalidCursor(cursor) from error
+
+
+def after_cursor(queryset, cursor):
+    """Посты старше курсора в порядке ленты: (-pub_date, -id).
+
+    В отличие от OFFSET цена страницы не зависит от её номера.
+    """
+    queryset = queryset.order_by('-pub_date', '-id')
+    if not cursor:
+        return queryset
+    pub_date, pk = decode_cursor(cursor)
+    return queryset.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+    )
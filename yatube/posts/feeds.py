@@ -0,0 +1,158 @@
+import hashlib
+import time
+from datetime import datetime
+
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from . import shards
+from .caches import (attach_authors, attach_groups, get_author_or_404,
+                     get_group_or_404)
+from .models import Post
+
+FEED_SIZE = 20
+FEED_TIMEOUT = 60 * 60
+FEED_CHANGED_KEY = 'posts:feeds:changed'
+
+
+def _bump():
+    cache.set(FEED_CHANGED_KEY, time.time(), None)
+
+
+def feeds_changed():
+    """Вызывается при записи поста: все ленты получают новую версию.
+
+    Версия лежит в общем кеше, её видят все процессы. Второй раз она
+    меняется после фиксации: иначе соседний процесс успел бы закешировать
+    ленту без поста под уже новой версией.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def last_changed():
+    changed = cache.get(FEED_CHANGED_KEY)
+    if changed is None:
+        # Кеш пуст: время записи неизвестно, считаем, что она была сейчас.
+        cache.add(FEED_CHANGED_KEY, time.time(), None)
+        changed = cache.get(FEED_CHANGED_KEY)
+    return changed
+
+
+def feed_last_modified(request, *args, **kwargs):
+    return datetime.fromtimestamp(int(last_changed()), tz=timezone.utc)
+
+
+def feed_etag(request, *args, **kwargs):
+    return hashlib.md5(
+        f'{request.path}:{last_changed()}'.encode()
+    ).hexdigest()
+
+
+def cached_feed(feed):
+    """Отдаёт ленту из кеша до следующей записи поста, понимает 304."""
+    @condition(etag_func=feed_etag, last_modified_func=feed_last_modified)
+    def view(request, *args, **kwargs):
+        key = f'posts:feed:{feed_etag(request)}'
+        response = cache.get(key)
+        if response is None:
+            response = feed(request, *args, **kwargs)
+            cache.set(key, response, FEED_TIMEOUT)
+        return response
+    return view
+
+
+class PostsFeed(Feed):
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def items(self):
+        return attach_authors(attach_groups(list(
+            shards.scatter(Post.objects.all())[:FEED_SIZE]
+        )))
+
+    def item_title(self, post):
+        return Truncator(post.text).chars(50)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return [post.group.title] if post.group_id else []
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_group_or_404(slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group_posts', kwargs={'slug': group.slug})
+
+    def items(self, group):
+        return attach_authors(attach_groups(list(
+            shards.scatter(group.posts.all())[:FEED_SIZE]
+        )))
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_author_or_404(username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', kwargs={'username': author.username})
+
+    def items(self, author):
+        return attach_authors(attach_groups(list(
+            shards.scatter(
+                Post.objects.all(), author_ids=[author.pk]
+            )[:FEED_SIZE]
+        )))
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomMixin, PostsFeed):
+    pass
+
+
+class GroupPostsAtomFeed(AtomMixin, GroupPostsFeed):
+    pass
+
+
+class AuthorPostsAtomFeed(AtomMixin, AuthorPostsFeed):
+    pass
@@ -0,0 +1,215 @@
+import heapq
+import time
+from itertools import islice
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from . import shards
+from .api import FIELDS, dumps, json_response, post_rows, serialize
+from .caches import get_group_or_404
+from .models import Post
+
+# Последние RING_SIZE новых постов лежат в кеше вместе с «полом»: id, до
+# которого включительно кольцо ничего не знает. Запрос «что нового после
+# since» при since >= пола обходится без базы.
+RING_SIZE = 200
+RECENT_KEY = 'posts:live:recent'
+RECENT_LOCK_KEY = 'posts:live:recent:lock'
+SINCE_LIMIT = 50
+LIVE_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+
+# Метки и кольцо живут недолго: если кеш разойдётся с базой, через
+# LIVE_TIMEOUT секунд их перечитают. Блокировку кольца remember ждёт
+# LOCK_ATTEMPTS раз по LOCK_DELAY секунд.
+LIVE_TIMEOUT = 60
+LOCK_TIMEOUT = 5
+LOCK_ATTEMPTS = 20
+LOCK_DELAY = 0.005
+
+# Поток SSE проверяет кеш раз в STREAM_INTERVAL секунд и завершается
+# через STREAM_DURATION, чтобы не держать обработчик WSGI бесконечно;
+# EventSource переподключится сам, передав Last-Event-ID.
+STREAM_INTERVAL = 2
+STREAM_HEARTBEAT = 15
+STREAM_DURATION = 5 * 60
+STREAM_RETRY = 3000
+
+
+def latest_key(group_id=None):
+    return f'posts:live:latest:{group_id or "all"}'
+
+
+def lock_recent():
+    for _ in range(LOCK_ATTEMPTS):
+        if cache.add(RECENT_LOCK_KEY, 1, LOCK_TIMEOUT):
+            return True
+        time.sleep(LOCK_DELAY)
+    return False
+
+
+def remember(post):
+    """Запоминает новый пост в кольце и обновляет метки последнего id.
+
+    Кольцо меняется под блокировкой в кеше: иначе два процесса,
+    одновременно записавшие посты, потеряли бы один из них.
+    """
+    pk = int(post.pk)
+    keys = [latest_key()]
+    if post.group_id:
+        keys.append(latest_key(post.group_id))
+    if not lock_recent():
+        # Без блокировки кольцу верить нельзя: читатели спросят базу.
+        cache.delete_many(keys + [RECENT_KEY])
+        return
+    try:
+        current = cache.get_many(keys + [RECENT_KEY])
+        recent = current.pop(RECENT_KEY, None) or {
+            'floor': pk - 1, 'items': [],
+        }
+        items = dict(recent['items'])
+        items[pk] = post.group_id
+        items = sorted(items.items())
+        floor = recent['floor']
+        if len(items) > RING_SIZE:
+            floor = items[-RING_SIZE - 1][0]
+            items = items[-RING_SIZE:]
+        markers = {key: max(current.get(key, 0), pk) for key in keys}
+        markers[RECENT_KEY] = {'floor': floor, 'items': items}
+        cache.set_many(markers, LIVE_TIMEOUT)
+    finally:
+        cache.delete(RECENT_LOCK_KEY)
+
+
+def group_posts_across(group_id=None):
+    posts = Post.objects.all()
+    if group_id:
+        posts = posts.filter(group_id=group_id)
+    return shards.across(posts)
+
+
+def latest_id(group_id=None):
+    key = latest_key(group_id)
+    latest = cache.get(key)
+    if latest is None:
+        latest = max(shards.gather(
+            lambda posts: posts.aggregate(latest=Max('pk'))['latest'] or 0,
+            group_posts_across(group_id),
+        ))
+        cache.add(key, latest, LIVE_TIMEOUT)
+    return latest
+
+
+def new_post_ids(since, group_id=None):
+    """id постов новее since; пустой ответ не обращается к базе."""
+    latest = latest_id(group_id)
+    if latest <= since:
+        return []
+    recent = cache.get(RECENT_KEY)
+    if recent is not None and since >= recent['floor']:
+        ids = [
+            pk for pk, post_group_id in recent['items']
+            if pk > since and (not group_id or post_group_id == group_id)
+        ]
+        # Метку могли перечитать из базы после того, как кольцо
+        # истекло: если кольцо отстало от неё, спрашиваем базу.
+        if ids and ids[-1] == latest:
+            return ids[:SINCE_LIMIT]
+    parts = shards.gather(lambda posts: list(
+        posts.filter(pk__gt=since).order_by('pk')
+        .values_list('pk', flat=True)[:SINCE_LIMIT]
+    ), group_posts_across(group_id))
+    return list(islice(heapq.merge(*parts), SINCE_LIMIT))
+
+
+def load_posts(ids):
+    if not ids:
+        return []
+    if shards.enabled():
+        posts = shards.in_bulk(Post.objects.all(), ids)
+        rows = post_rows(posts[pk] for pk in sorted(posts))
+    else:
+        columns = set().union(*(FIELDS[name] for name in LIVE_FIELDS))
+        rows = Post.objects.filter(pk__in=ids).order_by('pk').values(
+            *columns
+        )
+    return [serialize(row, LIVE_FIELDS) for row in rows]
+
+
+def parse_since(request):
+    value = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get(
+        'since'
+    )
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+def since_response(request, group_id=None):
+    since = parse_since(request)
+    if since is None:
+        # Без курсора клиент получает только текущую точку отсчёта.
+        return json_response(request, {
+            'results': [], 'last': latest_id(group_id),
+        })
+    ids = new_post_ids(since, group_id)
+    return json_response(request, {
+        'results': load_posts(ids),
+        'last': ids[-1] if ids else since,
+    })
+
+
+def event_stream(since, group_id=None):
+    yield f'retry: {STREAM_RETRY}\n\n'
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < STREAM_DURATION:
+        ids = new_post_ids(since, group_id)
+        for post in load_posts(ids):
+            yield (
+                f'id: {post["id"]}\nevent: post\n'
+                f'data: {dumps(post).decode()}\n\n'
+            )
+        # Удалённые посты тоже сдвигают курсор, чтобы не спрашивать о них.
+        since = ids[-1] if ids else since
+        now = time.monotonic()
+        if ids:
+            last_sent = now
+        elif now - last_sent >= STREAM_HEARTBEAT:
+            last_sent = now
+            yield ': ping\n\n'
+        time.sleep(STREAM_INTERVAL)
+
+
+def stream_response(request, group_id=None):
+    since = parse_since(request)
+    if since is None:
+        since = latest_id(group_id)
+    response = StreamingHttpResponse(
+        event_stream(since, group_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_safe
+def posts_since(request):
+    return since_response(request)
+
+
+@require_safe
+def group_posts_since(request, slug):
+    return since_response(request, get_group_or_404(slug).pk)
+
+
+@require_safe
+def posts_stream(request):
+    return stream_response(request)
+
+
+@require_safe
+def group_posts_stream(request, slug):
+    return stream_response(request, get_group_or_404(slug).pk)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from posts import archive, feeds, shards
+from posts.models import Comment
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты старше --days вместе с комментариями в архивные '
+        'таблицы пачками по --batch-size, по одной транзакции на пачку'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=archive.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше стольких дней',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=archive.ARCHIVE_BATCH,
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет перенесено',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total_posts = total_comments = 0
+        # Шарды и default, пока в нём остаются посты до включения шардов.
+        for alias in shards.hot_aliases():
+            if options['dry_run']:
+                posts = archive.old_posts(alias, cutoff)
+                total_posts += posts.count()
+                total_comments += Comment.objects.using(alias).filter(
+                    post__in=posts
+                ).count()
+                continue
+            while True:
+                posts, comments = archive.archive_batch(
+                    alias, cutoff, options['batch_size']
+                )
+                if not posts:
+                    break
+                total_posts += posts
+                total_comments += comments
+            connection = connections[alias]
+            if connection.vendor == 'sqlite':
+                # Статистика планировщика после удаления большой доли строк.
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA optimize')
+        if total_posts and not options['dry_run']:
+            cache.delete(shards.LEGACY_KEY)
+            feeds.feeds_changed()
+        prefix = 'Будет перенесено' if options['dry_run'] else 'Перенесено'
+        self.stdout.write(
+            f'{prefix}: постов {total_posts}, '
+            f'комментариев {total_comments}'
+        )
@@ -0,0 +1,319 @@
+import io
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import timedelta
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from core.storage import add_reference
+from posts import trending
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Показатель степенного распределения: чем больше, тем сильнее немногие
+# авторы, группы и посты собирают большую часть активности.
+POWER_LAW_EXPONENT = 1.1
+GROUPLESS_SHARE = 0.3
+IMAGE_VARIANTS = 16
+PASSWORD = 'yatube-password'
+# Большое простое число для перестановки индексов: популярными становятся
+# не только самые старые посты.
+PERMUTATION_PRIME = 1000003
+
+
+def power_law_index(rng, size, exponent=POWER_LAW_EXPONENT):
+    """Индекс 0..size-1 с вероятностью, убывающей как x ** -exponent."""
+    if size <= 1:
+        return 0
+    power = 1 - exponent
+    value = ((size ** power - 1) * rng.random() + 1) ** (1 / power)
+    return min(int(value) - 1, size - 1)
+
+
+def permuted(index, size):
+    if size % PERMUTATION_PRIME == 0:
+        return index
+    return index * PERMUTATION_PRIME % size
+
+
+def chunk_random(seed, kind, start):
+    return random.Random(f'{seed}:{kind}:{start}')
+
+
+def chunk_faker(seed, kind, start):
+    fake = Faker('ru_RU')
+    fake.seed_instance(f'{seed}:{kind}:{start}')
+    return fake
+
+
+def post_date(context, post_id):
+    """Посты равномерно распределены во времени в порядке id."""
+    position = (post_id - context['post_base']) / max(
+        context['posts'], 1
+    )
+    return context['start'] + context['span'] * position
+
+
+def generate_users(seed, start, count, context):
+    fake = chunk_faker(seed, 'users', start)
+    return [
+        User(
+            id=pk,
+            username=f'{fake.user_name()}{pk}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            email=fake.email(),
+            password=context['password'],
+            date_joined=context['start'],
+        )
+        for pk in range(start, start + count)
+    ]
+
+
+def generate_groups(seed, start, count, context):
+    fake = chunk_faker(seed, 'groups', start)
+    return [
+        Group(
+            id=pk,
+            title=fake.catch_phrase()[:200],
+            slug=f'group-{pk}',
+            description=fake.paragraph(),
+        )
+        for pk in range(start, start + count)
+    ]
+
+
+def generate_posts(seed, start, count, context):
+    rng = chunk_random(seed, 'posts', start)
+    fake = chunk_faker(seed, 'posts', start)
+    posts = []
+    for pk in range(start, start + count):
+        pub_date = post_date(context, pk)
+        group_id = None
+        if context['groups'] and rng.random() >= GROUPLESS_SHARE:
+            group_id = context['group_base'] + power_law_index(
+                rng, context['groups']
+            )
+        image = ''
+        if context['images'] and rng.random() < context['image_share']:
+            image = rng.choice(context['images'])
+        posts.append(Post(
+            id=pk,
+            text=fake.paragraph(nb_sentences=rng.randint(1, 8)),
+            pub_date=pub_date,
+            author_id=context['user_base'] + power_law_index(
+                rng, context['users']
+            ),
+            group_id=group_id,
+            image=image,
+            trending_score=trending.initial_score(0, pub_date),
+        ))
+    return posts
+
+
+def generate_comments(seed, start, count, context):
+    rng = chunk_random(seed, 'comments', start)
+    fake = chunk_faker(seed, 'comments', start)
+    comments = []
+    for _ in range(count):
+        post_id = context['post_base'] + permuted(
+            power_law_index(rng, context['posts']), context['posts']
+        )
+        created = min(
+            post_date(context, post_id)
+            + timedelta(seconds=rng.expovariate(1 / 3600)),
+            context['now'],
+        )
+        comments.append(Comment(
+            post_id=post_id,
+            author_id=context['user_base'] + power_law_index(
+                rng, context['users']
+            ),
+            text=fake.sentence(),
+            created=created,
+        ))
+    return comments
+
+
+def generate_follows(seed, start, count, context):
+    """Подписки пользователей start..start+count; пары не повторяются."""
+    rng = chunk_random(seed, 'follows', start)
+    users = context['users']
+    quota = round(context['follows'] * count / max(users, 1))
+    pairs = set()
+    attempts = quota * 4
+    while len(pairs) < quota and attempts:
+        attempts -= 1
+        user_id = start + rng.randrange(count)
+        author_id = context['user_base'] + power_law_index(rng, users)
+        if user_id != author_id:
+            pairs.add((user_id, author_id))
+    return [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in sorted(pairs)
+    ]
+
+
+GENERATORS = {
+    'users': generate_users,
+    'groups': generate_groups,
+    'posts': generate_posts,
+    'comments': generate_comments,
+    'follows': generate_follows,
+}
+
+
+def generate(spec):
+    kind, seed, start, count, context = spec
+    return kind, GENERATORS[kind](seed, start, count, context)
+
+
+@contextmanager
+def explicit_dates():
+    """bulk_create иначе перезапишет даты текущим временем."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def make_images(rng, count):
+    """Несколько разных картинок: посты с изображениями ссылаются на них."""
+    storage = Post._meta.get_field('image').storage
+    names = []
+    for number in range(count):
+        color = tuple(rng.randrange(256) for _ in range(3))
+        buffer = io.BytesIO()
+        Image.new('RGB', (960, 640), color).save(buffer, 'JPEG')
+        names.append(storage.save(
+            f'posts/generated-{number}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу правдоподобными данными: пользователи, группы, '
+        'посты, комментарии и подписки со степенным распределением '
+        'активности. При одном и том же --seed результат одинаков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--images', type=float, default=0,
+            help='Доля постов с картинкой, от 0 до 1',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить посты',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько процессов генерируют строки',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Строк в одной пачке и одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        # Посты пишутся в default: их id должны остаться меньше id шардов,
+        # затем shard_posts перенесёт их к авторам.
+        if any(
+            Post.objects.using(alias).exists()
+            for alias in settings.POST_SHARDS
+        ):
+            raise CommandError(
+                'Шарды уже заполнены: генерируйте данные до их включения'
+            )
+        # Даты отсчитываются от начала суток, так что повторный запуск
+        # в тот же день даёт те же данные.
+        now = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        span = timedelta(days=options['days'])
+        rng = random.Random(options['seed'])
+        context = {
+            'now': now,
+            'start': now - span,
+            'span': span,
+            'users': options['users'],
+            'groups': options['groups'],
+            'posts': options['posts'],
+            'follows': options['follows'],
+            'user_base': next_id(User),
+            'group_base': next_id(Group),
+            'post_base': next_id(Post),
+            'password': make_password(PASSWORD),
+            'image_share': options['images'],
+            'images': (
+                make_images(rng, IMAGE_VARIANTS) if options['images'] else []
+            ),
+        }
+        plan = [
+            ('users', context['user_base'], options['users']),
+            ('groups', context['group_base'], options['groups']),
+            ('posts', context['post_base'], options['posts']),
+            # Комментарии и подписки ссылаются на id, а не создают их.
+            ('comments', 0, options['comments']),
+            ('follows', context['user_base'], options['users']),
+        ]
+        # Дочерние процессы не должны унаследовать открытые соединения.
+        connections.close_all()
+        self.images = Counter()
+        with Pool(options['workers']) as pool, explicit_dates():
+            for kind, start, total in plan:
+                self.insert(pool, kind, start, total, context, options)
+        # bulk_create не вызывает сигналы: счётчики ссылок на картинки
+        # и кеши приводим в порядок сами.
+        for name, count in self.images.items():
+            add_reference(name, count)
+        cache.clear()
+
+    def insert(self, pool, kind, start, total, context, options):
+        size = options['chunk_size']
+        specs = [
+            (kind, options['seed'], start + offset,
+             min(size, total - offset), context)
+            for offset in range(0, total, size)
+        ]
+        created = 0
+        for kind, objects in pool.imap(generate, specs):
+            if not objects:
+                continue
+            with transaction.atomic():
+                type(objects[0]).objects.bulk_create(objects)
+            if kind == 'posts':
+                self.images.update(
+                    post.image for post in objects if post.image
+                )
+            created += len(objects)
+        self.stdout.write(f'{kind}: {created}')
@@ -0,0 +1,93 @@
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Case, IntegerField, Value, When
+
+from core.db import retry_on_busy
+from posts import feeds, shards
+from posts.models import Comment, MovedPost, Notification, Post
+
+from .generate_data import explicit_dates
+
+POST_COLUMNS = (
+    'id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+    'trending_score',
+)
+COMMENT_COLUMNS = ('post_id', 'author_id', 'text', 'created')
+
+
+@retry_on_busy
+def move_to_shard(alias, rows):
+    """Переносит посты rows из default в шард alias под новыми id.
+
+    Старый id записывается в MovedPost: страница поста по прежнему
+    адресу перенаправляет на новый. Возвращает число комментариев.
+    """
+    with transaction.atomic(), transaction.atomic(using=alias):
+        new_ids = dict(zip(
+            (row['id'] for row in rows), shards.next_ids(alias, len(rows))
+        ))
+        Post.objects.using(alias).bulk_create(
+            Post(**{**row, 'id': new_ids[row['id']]}) for row in rows
+        )
+        comments = Comment.objects.using(DEFAULT_DB_ALIAS).filter(
+            post_id__in=new_ids
+        )
+        moved = Comment.objects.using(alias).bulk_create(
+            Comment(**{**comment, 'post_id': new_ids[comment['post_id']]})
+            for comment in comments.order_by('pk').values(*COMMENT_COLUMNS)
+        )
+        Notification.objects.filter(post_id__in=new_ids).update(
+            post_id=Case(
+                *(When(post_id=old, then=Value(new))
+                  for old, new in new_ids.items()),
+                output_field=IntegerField(),
+            )
+        )
+        MovedPost.objects.bulk_create(
+            MovedPost(id=old, new_id=new) for old, new in new_ids.items()
+        )
+        # Ссылки на картинки переходят к новым строкам, счётчики StoredFile
+        # не меняются; сигналы удаления поэтому не нужны.
+        comments._raw_delete(DEFAULT_DB_ALIAS)
+        Post.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk__in=new_ids
+        )._raw_delete(DEFAULT_DB_ALIAS)
+    return len(moved)
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит посты, написанные до включения шардов, вместе с '
+        'комментариями из default в шарды авторов пачками по --batch-size'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not shards.enabled():
+            raise CommandError('Шарды не настроены: задайте POST_SHARDS')
+        total_posts = total_comments = 0
+        with explicit_dates():
+            while True:
+                rows = list(Post.objects.using(DEFAULT_DB_ALIAS).order_by(
+                    'pk'
+                ).values(*POST_COLUMNS)[:options['batch_size']])
+                if not rows:
+                    break
+                by_alias = defaultdict(list)
+                for row in rows:
+                    by_alias[shards.shard_of(row['author_id'])].append(row)
+                for alias, part in by_alias.items():
+                    total_comments += move_to_shard(alias, part)
+                total_posts += len(rows)
+        cache.delete(shards.LEGACY_KEY)
+        if total_posts:
+            feeds.feeds_changed()
+        self.stdout.write(
+            f'Перенесено: постов {total_posts}, '
+            f'комментариев {total_comments}'
+        )
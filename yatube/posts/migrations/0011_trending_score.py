@@ -0,0 +1,34 @@
+# Generated by Django 2.2.16 on 2026-10-19 08:41
+
+from django.db import migrations, models
+
+
+def score_existing_posts(apps, schema_editor):
+    from posts.trending import initial_score
+
+    Post = apps.get_model('posts', 'Post')
+    for post in Post.objects.only('pk', 'pub_date').iterator():
+        Post.objects.filter(pk=post.pk).update(
+            trending_score=initial_score(0, post.pub_date)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20211214_1312'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.RunPython(score_existing_posts, migrations.RunPython.noop),
+    ]
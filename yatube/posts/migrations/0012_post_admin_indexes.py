@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def create_fts(apps, schema_editor):
+    from posts.search import create_fts
+    create_fts(schema_editor)
+
+
+def drop_fts(apps, schema_editor):
+    from posts.search import drop_fts
+    drop_fts(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_trending_score'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='pub_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
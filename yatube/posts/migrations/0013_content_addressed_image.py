@@ -0,0 +1,37 @@
+import core.storage
+from django.db import migrations, models
+
+
+def count_references(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredFile = apps.get_model('core', 'StoredFile')
+    references = Post.objects.exclude(image='').values('image').annotate(
+        refcount=models.Count('id')
+    ).order_by()
+    StoredFile.objects.bulk_create(
+        StoredFile(name=row['image'], refcount=row['refcount'])
+        for row in references.iterator()
+    )
+
+
+def recreate_fts(apps, schema_editor):
+    from posts.search import create_fts
+    create_fts(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_storedfile'),
+        ('posts', '0012_post_admin_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Image'),
+        ),
+        migrations.RunPython(recreate_fts, migrations.RunPython.noop),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_notification_post_no_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.IntegerField()),
+            ],
+        ),
+    ]
@@ -2,6 +2,10 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import Q
 
+from core.storage import ContentAddressedStorage
+
+from . import shards
+
 User = get_user_model()
 
 
@@ -9,6 +13,7 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    trending_score = models.FloatField(default=0, db_index=True)
 
     def __str__(self):
         return self.title
@@ -16,7 +21,7 @@ class Group(models.Model):
 
 class Post(models.Model):
     text = models.TextField()
-    pub_date = models.DateTimeField(auto_now_add=True)
+    pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -31,8 +36,10 @@ class Post(models.Model):
     image = models.ImageField(
         'Image',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    trending_score = models.FloatField(default=0, db_index=True)
 
     class Meta:
         ordering = ('-pub_date',)
@@ -40,6 +47,14 @@ class Post(models.Model):
     def __str__(self):
         return self.text[:15]
 
+    def save(self, *args, **kwargs):
+        if self.pk is None and shards.enabled():
+            kwargs.pop('using', None)
+            kwargs.pop('force_insert', None)
+            shards.insert_post(self, super().save, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -88,3 +103,100 @@ class Follow(models.Model):
 
     def __str__(self):
         return self.user, self.author
+
+
+class Notification(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+    )
+    # Пост может лежать в шарде: ограничение внешнего ключа в default
+    # не создаётся, удаления с постом делает Django.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        db_constraint=False,
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    is_read = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ('-id',)
+        indexes = [
+            models.Index(
+                fields=['user', 'is_read'], name='notification_unread'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый командой archive_posts; id сохраняется."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField(db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        blank=True, null=True)
+    image = models.ImageField(
+        'Image',
+        upload_to='posts/',
+        storage=ContentAddressedStorage(),
+        blank=True
+    )
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('-pub_date',)
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+    )
+    text = models.TextField('Текст комментария')
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class PostSequence(models.Model):
+    """Последний выданный id поста, общий для всех шардов."""
+    last = models.IntegerField()
+
+    def __str__(self):
+        return str(self.last)
+
+
+class MovedPost(models.Model):
+    """Пост из default, перенесённый командой shard_posts под новым id."""
+    id = models.IntegerField(primary_key=True)
+    new_id = models.IntegerField()
+
+    def __str__(self):
+        return f'{self.id} -> {self.new_id}'
@@ -0,0 +1,101 @@
+from django.db import transaction
+from django.db.models import Count
+
+from core.storage import add_reference
+from core.tasks import enqueue, task
+
+from . import caches, feeds, shards
+from .models import Comment, Notification, Post
+
+BATCH_SIZE = 1000
+# Выборки больше этого размера обрабатываются фоновыми задачами.
+BACKGROUND_THRESHOLD = 5000
+
+
+def batches(queryset, size=None):
+    """Отдаёт первичные ключи пачками, не загружая выборку целиком."""
+    size = size or BATCH_SIZE
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        chunk = pks if last is None else pks.filter(pk__gt=last)
+        chunk = list(chunk[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+@task
+def reassign_group(post_ids, group_id):
+    """Переносит пачку постов в группу одним UPDATE на базу.
+
+    update() не вызывает post_save, поэтому версию лент меняем сами.
+    """
+    updated = sum(
+        Post.objects.using(alias).filter(pk__in=ids).update(group_id=group_id)
+        for alias, ids in shards.by_alias(post_ids).items()
+    )
+    feeds.feeds_changed()
+    return updated
+
+
+@task
+def delete_posts(post_ids):
+    """Удаляет пачку постов одним DELETE на таблицу.
+
+    Collector загрузил бы каждый пост и вызвал его сигналы post_delete,
+    поэтому их работа сделана здесь по разу на пачку: счётчики ссылок на
+    картинки, карточки авторов и версия лент.
+    """
+    deleted = 0
+    authors = set()
+    for alias, ids in shards.by_alias(post_ids).items():
+        posts = Post.objects.using(alias).filter(pk__in=ids)
+        images = posts.exclude(image='').values_list('image').annotate(
+            count=Count('pk')
+        ).order_by()
+        authors.update(posts.values_list('author_id', flat=True).distinct())
+        notifications = Notification.objects.filter(post_id__in=ids)
+        with transaction.atomic(), transaction.atomic(using=alias):
+            notifications._raw_delete(notifications.db)
+            Comment.objects.using(alias).filter(
+                post_id__in=ids
+            )._raw_delete(alias)
+            for name, count in images:
+                add_reference(name, -count)
+            deleted += posts._raw_delete(alias)
+    for author_id in authors:
+        caches.forget_author(author_id)
+    feeds.feeds_changed()
+    return deleted
+
+
+@task
+def purge_comments(post_ids):
+    return sum(
+        Comment.objects.using(alias).filter(
+            post_id__in=ids
+        )._raw_delete(alias)
+        for alias, ids in shards.by_alias(post_ids).items()
+    )
+
+
+def run_in_batches(operation, querysets, *args):
+    """Выполняет операцию над постами пачками.
+
+    querysets — выборки постов по базам (см. shards.across). Возвращает
+    пару (число постов, число фоновых задач): если постов больше
+    BACKGROUND_THRESHOLD, каждая пачка ставится в очередь.
+    """
+    total = sum(queryset.count() for queryset in querysets)
+    background = total > BACKGROUND_THRESHOLD
+    queued = 0
+    for queryset in querysets:
+        for post_ids in batches(queryset):
+            if background:
+                enqueue(operation.task_name, post_ids, *args)
+                queued += 1
+            else:
+                operation(post_ids, *args)
+    return total, queued
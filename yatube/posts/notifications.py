@@ -0,0 +1,54 @@
+from django.core.cache import cache
+
+from .models import Follow, Notification
+
+# Столько подписчиков получают уведомление сразу при публикации,
+# остальных обходит фоновая задача пачками по FANOUT_BATCH.
+FANOUT_INLINE = 100
+FANOUT_BATCH = 1000
+UNREAD_TIMEOUT = 60 * 15
+
+
+def unread_key(user_id):
+    return f'posts:unread:{user_id}'
+
+
+def unread_count(user_id):
+    key = unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(
+            user_id=user_id, is_read=False
+        ).count()
+        cache.set(key, count, UNREAD_TIMEOUT)
+    return count
+
+
+def forget_unread(user_ids):
+    cache.delete_many([unread_key(user_id) for user_id in user_ids])
+
+
+def fan_out(post_id, author_id, after=0, limit=FANOUT_BATCH):
+    """Создаёт уведомления подписчикам с id больше after.
+
+    Возвращает id последнего обработанного подписчика, если могли
+    остаться ещё, иначе None.
+    """
+    followers = list(Follow.objects.filter(
+        author_id=author_id, user_id__gt=after
+    ).order_by('user_id').values_list('user_id', flat=True)[:limit])
+    Notification.objects.bulk_create(
+        Notification(user_id=user_id, post_id=post_id)
+        for user_id in followers
+    )
+    forget_unread(followers)
+    return followers[-1] if len(followers) == limit else None
+
+
+def mark_read(user_id, ids=None):
+    notifications = Notification.objects.filter(user_id=user_id, is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(pk__in=ids)
+    updated = notifications.update(is_read=True)
+    forget_unread([user_id])
+    return updated
@@ -0,0 +1,400 @@
+"""Шардирование постов и комментариев по id автора.
+
+Шарды — псевдонимы баз из settings.POST_SHARDS; пустой список значит,
+что всё лежит в default и функции модуля ничего не меняют. Пост
+хранится в шарде автора, комментарии — в шарде поста. id нового поста
+подбирается сравнимым с id автора по модулю числа шардов, поэтому шард
+находится и по id поста, и по id автора без обращения к базе. id берутся
+из общей последовательности в default (PostSequence) и растут в порядке
+записи, как и без шардов: живая лента считает id курсором.
+
+JOIN между базами невозможен: ленты собираются из всех шардов слиянием
+(Scatter), а пользователи, группы и подписки берутся из default.
+
+Посты, написанные до включения шардов, остаются в default, пока их не
+перенесёт команда shard_posts. Их id не больше legacy_max(): id в
+шардах выдаются выше него, поэтому по id всегда понятно, где пост.
+Запросы к постам без подсказки роутер отправляет в default, так что
+читать посты нужно через scatter(), across(), for_post() или in_bulk().
+"""
+import heapq
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, F, Max
+
+from core.db import retry_on_busy
+
+SHARDED_MODELS = ('posts.post', 'posts.comment')
+FEED_ORDERING = ('-pub_date', '-pk')
+LEGACY_KEY = 'posts:shards:legacy-max'
+LEGACY_TIMEOUT = 60
+
+_executor = None
+
+
+def enabled():
+    return bool(settings.POST_SHARDS)
+
+
+def shard_of(pk):
+    """Шард автора с таким id или поста с таким id."""
+    aliases = settings.POST_SHARDS
+    return aliases[int(pk) % len(aliases)]
+
+
+def legacy_max():
+    """Наибольший id поста, оставшегося в default; 0 — таких нет.
+
+    Значение может отставать на LEGACY_TIMEOUT, но id в шардах всегда
+    больше любого прежнего максимума default, так что и устаревшее
+    значение делит id верно.
+    """
+    if not enabled():
+        return 0
+    last = cache.get(LEGACY_KEY)
+    if last is None:
+        Post = apps.get_model('posts', 'Post')
+        last = Post._base_manager.using(DEFAULT_DB_ALIAS).aggregate(
+            last=Max('pk')
+        )['last'] or 0
+        cache.set(LEGACY_KEY, last, LEGACY_TIMEOUT)
+    return last
+
+
+def hot_aliases():
+    """Базы с горячими постами: шарды и default, пока в нём есть посты."""
+    if not enabled():
+        return [DEFAULT_DB_ALIAS]
+    aliases = list(settings.POST_SHARDS)
+    if legacy_max():
+        aliases.append(DEFAULT_DB_ALIAS)
+    return aliases
+
+
+def post_alias(post_id, legacy=None):
+    if not enabled():
+        return DEFAULT_DB_ALIAS
+    if legacy is None:
+        legacy = legacy_max()
+    if int(post_id) <= legacy:
+        return DEFAULT_DB_ALIAS
+    return shard_of(post_id)
+
+
+def for_post(queryset, post_id):
+    """queryset в базе поста: по одному id его не найдёт роутер."""
+    return queryset.using(post_alias(post_id)) if enabled() else queryset
+
+
+def by_shard(ids):
+    """id авторов по их шардам."""
+    groups = defaultdict(list)
+    for pk in ids:
+        groups[shard_of(pk)].append(pk)
+    return groups
+
+
+def by_alias(post_ids):
+    """id постов по базам, где они лежат."""
+    legacy = legacy_max()
+    groups = defaultdict(list)
+    for pk in post_ids:
+        groups[post_alias(pk, legacy)].append(pk)
+    return groups
+
+
+def author_aliases(author_ids):
+    """{база: id авторов}: шард каждого автора и default с его старыми
+    постами."""
+    groups = by_shard(author_ids)
+    if legacy_max():
+        groups[DEFAULT_DB_ALIAS] = list(author_ids)
+    return groups
+
+
+def across(queryset, author_ids=None):
+    """Копии queryset для каждой базы, где могут быть его посты.
+
+    С author_ids — только базы этих авторов; фильтр по авторам
+    накладывает вызывающий.
+    """
+    if not enabled():
+        return [queryset]
+    if author_ids is None:
+        aliases = hot_aliases()
+    else:
+        aliases = author_aliases(author_ids)
+    return [queryset.using(alias) for alias in aliases]
+
+
+class ShardRouter:
+    """Посты и комментарии — в шарде автора, остальные модели — в default.
+
+    Запросы к постам без экземпляра-подсказки роутер не направляет:
+    их нужно выполнять через scatter(), for_post() или using().
+    """
+
+    def route(self, model, instance=None, **hints):
+        if not enabled():
+            return None
+        if model._meta.label_lower not in SHARDED_MODELS:
+            return DEFAULT_DB_ALIAS
+        if instance is None:
+            return None
+        if instance._meta.label_lower == 'posts.post':
+            # Загруженный пост остаётся в своей базе, новый идёт в шард
+            # автора.
+            if instance._state.db:
+                return instance._state.db
+            return shard_of(instance.author_id)
+        if isinstance(instance, apps.get_model(settings.AUTH_USER_MODEL)):
+            return shard_of(instance.pk)
+        # Комментарии и уведомления ссылаются на пост.
+        post_id = getattr(instance, 'post_id', None)
+        return post_alias(post_id) if post_id else None
+
+    db_for_read = route
+    db_for_write = route
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True if enabled() else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in settings.POST_SHARDS:
+            return None
+        return f'{app_label}.{model_name}' in SHARDED_MODELS
+
+
+@retry_on_busy
+def insert_post(post, save, **kwargs):
+    """Сохраняет новый пост в шарде автора.
+
+    id выдаётся и пост вставляется, пока открыта транзакция default:
+    она держит блокировку последовательности, поэтому посты фиксируются
+    в порядке id. Занятую блокировку SQLite отвергает ответом «database
+    is locked», и retry_on_busy повторит всё заново.
+    """
+    alias = shard_of(post.author_id)
+    kwargs.update(using=alias, force_insert=True)
+    with transaction.atomic(), transaction.atomic(using=alias):
+        post.pk = next_ids(alias, 1)[0]
+        save(**kwargs)
+
+
+def max_post_id():
+    """Наибольший id, занятый постом в любой базе, архиве или
+    перенаправлении."""
+    models = [
+        (apps.get_model('posts', name), DEFAULT_DB_ALIAS)
+        for name in ('Post', 'ArchivedPost', 'MovedPost')
+    ]
+    models += [
+        (apps.get_model('posts', 'Post'), alias)
+        for alias in settings.POST_SHARDS
+    ]
+    return max(
+        model._base_manager.using(alias).aggregate(
+            last=Max('pk')
+        )['last'] or 0
+        for model, alias in models
+    )
+
+
+def next_ids(alias, count):
+    """count новых id шарда alias из общей последовательности.
+
+    Вызывать в транзакциях default и alias: строка последовательности
+    остаётся заблокированной до фиксации вставки.
+    """
+    PostSequence = apps.get_model('posts', 'PostSequence')
+    Post = apps.get_model('posts', 'Post')
+    sequence = PostSequence.objects.using(DEFAULT_DB_ALIAS).filter(pk=1)
+    # Пустой UPDATE тоже берёт блокировку записи default.
+    if not sequence.update(last=F('last')):
+        PostSequence.objects.using(DEFAULT_DB_ALIAS).create(
+            pk=1, last=max_post_id()
+        )
+    last = max(
+        sequence.values_list('last', flat=True).get(),
+        # Старые посты в default всегда должны остаться ниже шардов.
+        Post._base_manager.using(DEFAULT_DB_ALIAS).aggregate(
+            last=Max('pk')
+        )['last'] or 0,
+    )
+    aliases = settings.POST_SHARDS
+    # Ближайший id больше last, сравнимый с номером шарда.
+    first = last + 1 + (aliases.index(alias) - last - 1) % len(aliases)
+    ids = list(range(first, first + count * len(aliases), len(aliases)))
+    sequence.update(last=ids[-1])
+    return ids
+
+
+def _forget_executor():
+    global _executor
+    _executor = None
+
+
+# Потоки пула не переживают fork: дочернему процессу нужен свой пул.
+os.register_at_fork(after_in_child=_forget_executor)
+
+
+def gather(func, items):
+    """func для каждого элемента, параллельно по потоку на шард."""
+    global _executor
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            len(settings.POST_SHARDS), thread_name_prefix='shards'
+        )
+    return list(_executor.map(func, items))
+
+
+class Scatter:
+    """Один запрос ко всем шардам; срез собирается слиянием.
+
+    Поддерживает то, что нужно Paginator и after_cursor: count(),
+    срезы, filter(), exclude() и order_by() только по убыванию.
+    """
+
+    ordered = True
+
+    def __init__(self, querysets, ordering=FEED_ORDERING):
+        self.ordering = tuple(ordering)
+        if not {'-pk', '-id'} & set(self.ordering):
+            self.ordering += ('-pk',)
+        self.querysets = [qs.order_by(*self.ordering) for qs in querysets]
+
+    def _clone(self, method, *args, **kwargs):
+        return Scatter([
+            getattr(qs, method)(*args, **kwargs) for qs in self.querysets
+        ], self.ordering)
+
+    def filter(self, *args, **kwargs):
+        return self._clone('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._clone('exclude', *args, **kwargs)
+
+    def order_by(self, *fields):
+        if not all(field.startswith('-') for field in fields):
+            raise ValueError('Слияние шардов умеет только порядок по убыванию')
+        if not {'-pk', '-id'} & set(fields):
+            fields += ('-pk',)
+        return Scatter(self.querysets, fields)
+
+    def count(self):
+        return sum(gather(lambda qs: qs.count(), self.querysets))
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        fields = [field[1:] for field in self.ordering]
+        # Каждый шард отдаёт ключи сортировки первых stop строк: в общий
+        # срез больше от одного шарда не попадёт. Целиком загружаются
+        # только строки самого среза.
+        parts = gather(lambda item: [
+            (values, item[0]) for values in (
+                item[1].values_list(*fields) if stop is None
+                else item[1].values_list(*fields)[:stop]
+            )
+        ], list(enumerate(self.querysets)))
+        page = list(islice(heapq.merge(
+            *parts, key=lambda part: part[0], reverse=True
+        ), start, stop))
+        pk_index = fields.index('pk' if 'pk' in fields else 'id')
+        wanted = defaultdict(list)
+        for values, index in page:
+            wanted[index].append(values[pk_index])
+        indexes = list(wanted)
+        objects = {}
+        for index, rows in zip(indexes, gather(
+            lambda index: self.querysets[index].order_by().in_bulk(
+                wanted[index]
+            ),
+            indexes,
+        )):
+            objects.update(((index, pk), obj) for pk, obj in rows.items())
+        return [
+            objects[index, values[pk_index]] for values, index in page
+            if (index, values[pk_index]) in objects
+        ]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def scatter(queryset, author_ids=None, ordering=FEED_ORDERING):
+    """queryset по всем шардам или только по шардам авторов author_ids.
+
+    Без шардов возвращает queryset (с author_ids — отфильтрованный).
+    """
+    if not enabled():
+        if author_ids is not None:
+            queryset = queryset.filter(author_id__in=author_ids)
+        return queryset
+    if author_ids is None:
+        querysets = across(queryset)
+    else:
+        querysets = [
+            queryset.using(alias).filter(author_id__in=ids)
+            for alias, ids in author_aliases(author_ids).items()
+        ]
+    return Scatter(querysets, ordering)
+
+
+def in_bulk(queryset, ids):
+    """{pk: пост} для постов из разных баз."""
+    if not enabled():
+        return queryset.in_bulk(ids)
+    objects = {}
+    for part in gather(
+        lambda item: item[0].using(item[1]).in_bulk(item[2]),
+        [(queryset, alias, pks) for alias, pks in by_alias(ids).items()],
+    ):
+        objects.update(part)
+    return objects
+
+
+def attach_posts(objects):
+    """Подставляет посты объектам с post_id; с удалёнными — отбрасывает."""
+    Post = apps.get_model('posts', 'Post')
+    posts = in_bulk(Post.objects.all(), {obj.post_id for obj in objects})
+    attached = []
+    for obj in objects:
+        if obj.post_id in posts:
+            obj.post = posts[obj.post_id]
+            attached.append(obj)
+    return attached
+
+
+def posts_counts(author_ids):
+    """{id автора: число постов} по шардам авторов."""
+    Post = apps.get_model('posts', 'Post')
+    counts = defaultdict(int)
+    for part in gather(lambda item: list(
+        Post.objects.using(item[0]).filter(author_id__in=item[1])
+        .order_by().values_list('author_id').annotate(Count('pk'))
+    ), author_aliases(author_ids).items()):
+        for author_id, count in part:
+            counts[author_id] += count
+    return counts
+
+
+def select_related(queryset, *fields):
+    """JOIN с моделями из default; с шардами связи грузятся отдельно."""
+    if enabled():
+        return queryset.prefetch_related(*fields)
+    return queryset.select_related(*fields)
@@ -0,0 +1,173 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+from core.storage import add_reference
+
+from . import (caches, comments, feeds, live, moderation, shards, tasks,
+               trending)
+from .models import ArchivedPost, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+# Число запросов в работе: пачке комментариев незачем ждать соседей,
+# если процесс больше ничего не обрабатывает.
+request_started.connect(
+    comments.request_started, dispatch_uid='posts.comments.started'
+)
+request_finished.connect(
+    comments.request_finished, dispatch_uid='posts.comments.finished'
+)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_groups(sender, **kwargs):
+    caches.forget_groups()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_card(sender, instance, **kwargs):
+    caches.forget_author(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_author_card(sender, instance, created=True, **kwargs):
+    # Счётчики в карточке меняются только при появлении и удалении строк.
+    if created:
+        caches.forget_author(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feeds(sender, **kwargs):
+    feeds.feeds_changed()
+
+
+@receiver(post_save, sender=Post)
+def notify_followers(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        tasks.notify_followers(instance)
+
+
+@receiver(post_save, sender=Post)
+def remember_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        live.remember(instance)
+
+
+@receiver(pre_save, sender=Post)
+def set_initial_score(sender, instance, raw=False, **kwargs):
+    if raw or not instance._state.adding:
+        return
+    followers_count = Follow.objects.filter(
+        author_id=instance.author_id
+    ).count()
+    instance.trending_score = trending.initial_score(followers_count)
+
+
+@receiver(post_save, sender=Post)
+def score_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.group_id:
+        trending.bump(
+            Group.objects.filter(pk=instance.group_id),
+            trending.GROUP_POST_WEIGHT,
+        )
+
+
+@receiver(post_save, sender=Comment)
+def score_new_comment(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    trending.bump(
+        shards.for_post(Post.objects.filter(pk=instance.post_id),
+                        instance.post_id),
+        trending.COMMENT_WEIGHT,
+    )
+    if instance.post.group_id:
+        trending.bump(
+            Group.objects.filter(pk=instance.post.group_id),
+            trending.COMMENT_WEIGHT,
+        )
+
+
+@receiver(post_save, sender=Follow)
+def score_new_follow(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    for queryset in shards.across(
+        trending.follow_boost_queryset(instance.author),
+        author_ids=[instance.author_id],
+    ):
+        trending.bump(queryset, trending.FOLLOWER_WEIGHT)
+
+
+# Collector удаляет и обновляет связанные строки только в default:
+# посты и комментарии в шардах обрабатываются здесь.
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_posts(sender, instance, **kwargs):
+    if not shards.enabled():
+        return
+    alias = shards.shard_of(instance.pk)
+    moderation.delete_posts(list(
+        Post.objects.using(alias).filter(
+            author_id=instance.pk
+        ).values_list('pk', flat=True)
+    ))
+    for alias in settings.POST_SHARDS:
+        comments = Comment.objects.using(alias).filter(author_id=instance.pk)
+        comments._raw_delete(alias)
+
+
+@receiver(pre_delete, sender=Group)
+def ungroup_sharded_posts(sender, instance, **kwargs):
+    if not shards.enabled():
+        return
+    for alias in settings.POST_SHARDS:
+        Post.objects.using(alias).filter(group_id=instance.pk).update(
+            group_id=None
+        )
+
+
+def image_name(instance):
+    # Берём сырое значение, чтобы не загружать отложенное поле.
+    image = instance.__dict__.get('image')
+    return getattr(image, 'name', image) or ''
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    # Из базы приходит строка; новый загруженный файл ещё не сохранён.
+    image = instance.__dict__.get('image')
+    instance._stored_image = image if isinstance(image, str) else ''
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, created, raw=False, **kwargs):
+    if raw or 'image' not in instance.__dict__:
+        return
+    old = '' if created else instance._stored_image
+    new = image_name(instance)
+    if old != new:
+        add_reference(new, 1)
+        add_reference(old, -1)
+        instance._stored_image = new
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    add_reference(instance._stored_image, -1)
+
+
+@receiver(post_delete, sender=ArchivedPost)
+def release_archived_image(sender, instance, **kwargs):
+    add_reference(instance.image.name, -1)
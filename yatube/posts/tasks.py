@@ -0,0 +1,31 @@
+from core.images import responsive_variants
+from core.tasks import task
+
+from . import shards
+from .models import Post
+from .notifications import FANOUT_INLINE, fan_out
+
+
+@task
+def warm_thumbnails(post_id):
+    post = shards.for_post(Post.objects, post_id).filter(pk=post_id).first()
+    if post is not None and post.image:
+        responsive_variants(post.image)
+
+
+@task
+def fan_out_notifications(post_id, author_id, after):
+    if not shards.for_post(Post.objects, post_id).filter(
+        pk=post_id
+    ).exists():
+        return
+    last = fan_out(post_id, author_id, after)
+    if last is not None:
+        fan_out_notifications.delay(post_id, author_id, last)
+
+
+def notify_followers(post):
+    """Первые подписчики узнают о посте сразу, остальные — из очереди."""
+    last = fan_out(post.pk, post.author_id, limit=FANOUT_INLINE)
+    if last is not None:
+        fan_out_notifications.delay(post.pk, post.author_id, last)
@@ -0,0 +1,171 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import StoredFile, Task
+from core.storage import add_reference
+
+from .. import moderation
+from ..admin import EstimatedCountPaginator
+from ..models import Comment, Follow, Group, Notification, Post
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.cat_post = Post.objects.create(
+            author=cls.admin, text='Кошка мяукает', group=cls.group
+        )
+        cls.dog_post = Post.objects.create(
+            author=cls.admin, text='Собака лает'
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_search_finds_posts_by_word_prefix(self):
+        """Поиск в админке находит посты по началу слова."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кош'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.cat_post]
+        )
+
+    def test_search_sees_edited_text(self):
+        """Поисковый индекс обновляется при изменении текста поста."""
+        Post.objects.filter(pk=self.dog_post.pk).update(text='Собака спит')
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'спит'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dog_post]
+        )
+
+    def test_paginator_uses_estimate_only_without_filters(self):
+        """Без фильтров число постов берётся из статистики SQLite."""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute(
+                "UPDATE sqlite_stat1 SET stat = '500000 1' "
+                "WHERE tbl = 'posts_post'"
+            )
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 500000)
+        paginator = EstimatedCountPaginator(
+            Post.objects.filter(group=self.group), 10
+        )
+        self.assertEqual(paginator.count, 1)
+
+
+class ModerationActionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.spammer = User.objects.create_user(username='spammer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.posts = [
+            Post.objects.create(author=self.spammer, text=f'Спам {number}')
+            for number in range(5)
+        ]
+        self.own_post = Post.objects.create(author=self.admin, text='Свой')
+        for post in self.posts:
+            Comment.objects.create(post=post, author=self.admin, text='Нет')
+
+    def run_action(self, action, posts, **extra):
+        return self.admin_client.post(
+            reverse('admin:posts_post_changelist'),
+            {
+                'action': action,
+                '_selected_action': [post.pk for post in posts],
+                **extra,
+            },
+        )
+
+    def test_reassign_group(self):
+        """Выбранные посты переносятся в группу."""
+        self.run_action('reassign_group', self.posts, group=self.group.pk)
+        self.assertEqual(self.group.posts.count(), len(self.posts))
+
+    def test_reassign_group_refreshes_feeds(self):
+        """Лента группы сразу показывает перенесённые посты."""
+        cache.clear()
+        url = reverse('posts:group_rss', kwargs={'slug': 'test-slug'})
+        self.assertNotContains(self.client.get(url), 'Спам 0')
+        self.run_action('reassign_group', self.posts, group=self.group.pk)
+        self.assertContains(self.client.get(url), 'Спам 0')
+
+    def test_delete_by_author(self):
+        """Удаляются все посты авторов выбранных постов и комментарии."""
+        self.run_action('delete_by_author', self.posts[:1])
+        self.assertFalse(Post.objects.filter(author=self.spammer).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Post.objects.filter(pk=self.own_post.pk).exists())
+
+    def test_delete_releases_images_and_notifications(self):
+        """Удаление пачкой снимает ссылки на картинки и уведомления."""
+        image = 'posts/spam.gif'
+        Post.objects.filter(pk__in=[post.pk for post in self.posts]).update(
+            image=image
+        )
+        add_reference(image, len(self.posts))
+        Follow.objects.create(user=self.admin, author=self.spammer)
+        Post.objects.create(author=self.spammer, text='Ещё')
+        self.assertTrue(Notification.objects.exists())
+        self.run_action('delete_by_author', self.posts[:1])
+        self.assertEqual(StoredFile.objects.get(name=image).refcount, 0)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_changelist_has_no_group_select(self):
+        """Группа для действий вводится по id, без списка всех групп."""
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist')
+        )
+        self.assertContains(response, 'vForeignKeyRawIdAdminField')
+        self.assertNotContains(response, '<select name="group"')
+
+    def test_purge_comments(self):
+        """Комментарии удаляются, посты остаются."""
+        self.run_action('purge_comments', self.posts)
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Post.objects.count(), len(self.posts) + 1)
+
+    def test_large_selection_is_queued_in_batches(self):
+        """Большая выборка уходит в фоновые задачи по пачкам."""
+        with mock.patch.object(moderation, 'BACKGROUND_THRESHOLD', 2), \
+                mock.patch.object(moderation, 'BATCH_SIZE', 2):
+            self.run_action('delete_in_batches', self.posts)
+        self.assertEqual(Post.objects.count(), len(self.posts) + 1)
+        self.assertEqual(
+            Task.objects.filter(
+                name=moderation.delete_posts.task_name
+            ).count(),
+            3,
+        )
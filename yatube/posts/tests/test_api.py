@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostsApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(15):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group if number % 2 else None,
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_pagination(self):
+        """Курсор проходит ленту без пропусков и повторов."""
+        url = reverse('posts:api_index') + '?limit=4'
+        seen = []
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                data = self.guest_client.get(url).json()
+                seen += [item['id'] for item in data['results']]
+                url = data['next']
+        self.assertEqual(
+            seen,
+            list(Post.objects.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )),
+        )
+        self.assertEqual(len(queries), 4)
+
+    def test_embedded_objects(self):
+        """Автор и группа встроены в пост."""
+        data = self.guest_client.get(
+            reverse('posts:api_group_posts', kwargs={'slug': 'test-slug'})
+        ).json()
+        item = data['results'][0]
+        self.assertEqual(item['author']['username'], 'author')
+        self.assertEqual(item['author']['first_name'], 'Лев')
+        self.assertEqual(item['group']['slug'], 'test-slug')
+        self.assertIsNone(item['image'])
+
+    def test_sparse_fieldsets(self):
+        """?fields= оставляет только запрошенные поля."""
+        url = reverse('posts:api_profile', kwargs={'username': 'author'})
+        data = self.guest_client.get(url + '?fields=id,text').json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.guest_client.get(url + '?fields=password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        url = reverse('posts:api_index')
+        response = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_follow_feed(self):
+        """Лента подписок требует авторизации."""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        client = Client()
+        client.force_login(self.reader)
+        self.assertEqual(len(client.get(url).json()['results']), 10)
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор — ошибка 400, а не 500."""
+        response = self.guest_client.get(
+            reverse('posts:api_index') + '?cursor=!!!'
+        )
+        self.assertEqual(response.status_code, 400)
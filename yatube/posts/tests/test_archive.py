@@ -0,0 +1,128 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow,
+                      Notification, Post)
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        old = timezone.now() - timedelta(days=400)
+        self.old_posts = []
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.author, text=f'Старый {number}'
+            )
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=old + timedelta(hours=number)
+            )
+            self.old_posts.append(post)
+        Comment.objects.create(
+            post=self.old_posts[0], author=self.reader, text='Комментарий'
+        )
+        self.new_posts = [
+            Post.objects.create(author=self.author, text=f'Новый {number}')
+            for number in range(8)
+        ]
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command('archive_posts', days=365, batch_size=2, stdout=out,
+                     **options)
+        return out.getvalue()
+
+    def test_old_posts_moved(self):
+        """Старые посты и их комментарии переносятся в архив пачками."""
+        self.assertIn('постов 5, комментариев 1', self.archive())
+        self.assertEqual(
+            set(Post.objects.values_list('pk', flat=True)),
+            {post.pk for post in self.new_posts},
+        )
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list('pk', flat=True)),
+            {post.pk for post in self.old_posts},
+        )
+        comment = ArchivedComment.objects.get()
+        self.assertEqual(comment.post_id, self.old_posts[0].pk)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Notification.objects.filter(
+            post_id__in=[post.pk for post in self.old_posts]
+        ).exists())
+
+    def test_dry_run(self):
+        """--dry-run только считает посты."""
+        self.assertIn(
+            'Будет перенесено: постов 5, комментариев 1',
+            self.archive(dry_run=True),
+        )
+        self.assertFalse(ArchivedPost.objects.exists())
+
+    def test_post_detail_falls_through(self):
+        """Архивный пост открывается по прежнему адресу без формы."""
+        self.archive()
+        post = self.old_posts[0]
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['is_archived'])
+        self.assertEqual(response.context['posts_count'], 13)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий'],
+        )
+        self.assertNotContains(
+            response, reverse('posts:add_comment', kwargs={'post_id': post.pk})
+        )
+
+    def test_profile_pages_continue_into_archive(self):
+        """Профиль показывает горячие посты, а за ними архивные."""
+        self.archive()
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        response = self.client.get(url)
+        self.assertEqual(response.context['posts_count'], 13)
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            [f'Новый {number}' for number in range(7, -1, -1)]
+            + ['Старый 4', 'Старый 3'],
+        )
+        response = self.client.get(url + '?page=2')
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            ['Старый 2', 'Старый 1', 'Старый 0'],
+        )
+
+    def test_profile_fragment_reaches_archive(self):
+        """Подгрузка профиля по курсору продолжается архивом."""
+        self.archive()
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'})
+        )
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(
+            reverse('posts:profile_fragment', kwargs={'username': 'author'}),
+            {'cursor': cursor},
+        )
+        self.assertEqual(
+            [post.text for post in response.context['posts']],
+            ['Старый 2', 'Старый 1', 'Старый 0'],
+        )
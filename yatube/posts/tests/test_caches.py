@@ -0,0 +1,133 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import caches
+from ..models import ArchivedPost, Follow, Group, Post
+
+User = get_user_model()
+
+
+class GroupRegistryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def group_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        return response, [
+            query['sql'] for query in queries
+            if 'posts_group' in query['sql']
+        ]
+
+    def test_hot_path_does_not_query_groups(self):
+        """Повторные запросы страниц не обращаются к таблице групп."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'test-slug'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        caches.groups()
+        for url in urls:
+            with self.subTest(url=url):
+                response, queries = self.group_queries(url)
+                self.assertEqual(queries, [])
+                self.assertEqual(response.status_code, 200)
+
+    def test_save_invalidates_registry(self):
+        """Изменение группы сразу видно через реестр."""
+        self.assertEqual(caches.get_group(self.group.pk).title,
+                         'Тестовая группа')
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(caches.get_group(self.group.pk).title,
+                         'Новое название')
+
+    def test_stale_load_not_written_after_forget(self):
+        """Копия, прочитанная до сброса реестра, не попадает в кеш."""
+        generation = caches._generation()
+        caches.forget_groups()
+        caches._load_groups(generation)
+        self.assertIsNone(cache.get(caches.GROUPS_KEY))
+
+    def test_unknown_slug_is_404(self):
+        """Несуществующая группа по-прежнему отдаёт 404."""
+        response = self.guest_client.get(
+            reverse('posts:group_posts', kwargs={'slug': 'missing'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class AuthorCardTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_profile_does_not_query_users(self):
+        """Повторный показ профиля и ленты не читает auth_user."""
+        urls = (
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:index'),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                self.assertContains(response, 'Лев Толстой')
+                self.assertFalse(any(
+                    'auth_user' in query['sql'] for query in queries
+                ))
+
+    def test_card_is_invalidated(self):
+        """Карточка обновляется при сохранении пользователя и новом посте."""
+        author = caches.get_author_or_404('author')
+        self.assertEqual(author.posts_count, 1)
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        Post.objects.create(author=self.author, text='Ещё пост')
+        author = caches.get_author_or_404('author')
+        self.assertEqual(author.get_full_name(), 'Алексей Толстой')
+        self.assertEqual(author.posts_count, 2)
+
+    def test_card_counts_are_independent(self):
+        """Посты, подписчики и архив считаются без перемножения строк."""
+        Post.objects.create(author=self.author, text='Второй')
+        for number in range(3):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{number}'),
+                author=self.author,
+            )
+        ArchivedPost.objects.create(
+            id=1000, author=self.author, text='Архив',
+            pub_date=timezone.now(),
+        )
+        author = caches.get_author_or_404('author')
+        self.assertEqual(author.posts_count, 3)
+        self.assertEqual(author.followers_count, 3)
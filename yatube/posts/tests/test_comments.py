@@ -0,0 +1,114 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import comments
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class CommentIngestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.pk}
+        )
+
+    @mock.patch.object(comments, 'COMMENT_RATE_LIMIT', 2)
+    def test_rate_limit(self):
+        """Сверх лимита комментарии не сохраняются, ответ 429."""
+        statuses = [
+            self.client.post(self.url, {'text': f'Да {number}'}).status_code
+            for number in range(3)
+        ]
+        self.assertEqual(statuses, [302, 302, 429])
+        self.assertEqual(Comment.objects.count(), 2)
+
+    @mock.patch.object(comments, 'COMMENT_RATE_LIMIT', 1)
+    def test_rate_window_does_not_stretch(self):
+        """Попытки внутри окна не продлевают его."""
+        start = time.time()
+        moments = (start, start + comments.COMMENT_RATE_WINDOW - 1)
+        for moment, limited in zip(moments, (False, True)):
+            with mock.patch('time.time', return_value=moment):
+                self.assertEqual(comments.rate_limited(self.user.pk), limited)
+        with mock.patch(
+            'time.time', return_value=start + comments.COMMENT_RATE_WINDOW
+        ):
+            self.assertFalse(comments.rate_limited(self.user.pk))
+
+    def test_batch_scores_post_and_group(self):
+        """Пачка комментариев поднимает рейтинг поста и группы."""
+        post_score = self.post.trending_score
+        group_score = Group.objects.get(pk=self.group.pk).trending_score
+        comments.save_comments([
+            Comment(post=self.post, author=self.user, text='Да'),
+            Comment(post=self.post, author=self.user, text='Нет'),
+        ])
+        self.assertEqual(self.post.comments.count(), 2)
+        self.assertGreater(
+            Post.objects.get(pk=self.post.pk).trending_score, post_score
+        )
+        self.assertGreater(
+            Group.objects.get(pk=self.group.pk).trending_score, group_score
+        )
+
+    @mock.patch.object(comments, 'COMMENT_BATCH_DELAY', 5)
+    @mock.patch.object(comments, 'COMMENT_BATCH_SIZE', 3)
+    @mock.patch.object(comments, 'other_requests', return_value=True)
+    @mock.patch.object(comments, 'save_comments')
+    def test_concurrent_comments_share_transaction(self, save_comments, _):
+        """Одновременные комментарии записываются одной пачкой."""
+        threads = [
+            threading.Thread(target=comments.submit_comment, args=(number,))
+            for number in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        save_comments.assert_called_once()
+        self.assertCountEqual(save_comments.call_args[0][0], [0, 1, 2])
+
+    @mock.patch.object(comments, 'COMMENT_BATCH_DELAY', 5)
+    def test_single_request_does_not_wait(self):
+        """Без других запросов в процессе пачка пишется без ожидания."""
+        started = time.monotonic()
+        response = self.client.post(self.url, {'text': 'Сразу'})
+        self.assertEqual(response.status_code, 302)
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(Comment.objects.get().text, 'Сразу')
+
+    @mock.patch.object(comments, 'save_comments')
+    def test_failed_batch_falls_back_to_single_inserts(self, save_comments):
+        """Ошибка одного комментария не достаётся остальным в пачке."""
+        def save(batch):
+            if any(comment == 'плохой' for comment in batch):
+                raise ValueError('плохой')
+        save_comments.side_effect = save
+        batch = comments.Batch()
+        batch.comments = ['хороший', 'плохой', 'ещё один']
+        comments.write_batch(batch)
+        self.assertEqual(list(batch.errors), [id(batch.comments[1])])
+        self.assertEqual(save_comments.call_count, 4)
@@ -0,0 +1,80 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import _create_cache, cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import feeds
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первый пост', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_list_posts(self):
+        """RSS и Atom для сайта, группы и автора содержат посты."""
+        urls = (
+            reverse('posts:rss'),
+            reverse('posts:atom'),
+            reverse('posts:group_rss', kwargs={'slug': 'test-slug'}),
+            reverse('posts:group_atom', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile_rss', kwargs={'username': 'author'}),
+            reverse('posts:profile_atom', kwargs={'username': 'author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), 'Первый пост')
+
+    def test_cached_until_post_written(self):
+        """Лента берётся из кеша, пока не появится новый пост."""
+        url = reverse('posts:rss')
+        self.guest_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+        self.assertEqual(len(queries), 0)
+        Post.objects.create(author=self.author, text='Второй пост')
+        self.assertContains(self.guest_client.get(url), 'Второй пост')
+
+    def test_conditional_get(self):
+        """Читатель с актуальными ETag или Last-Modified получает 304."""
+        url = reverse('posts:atom')
+        response = self.guest_client.get(url)
+        for header, value in (
+            ('HTTP_IF_NONE_MATCH', response['ETag']),
+            ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified']),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(
+                    self.guest_client.get(url, **{header: value}).status_code,
+                    304,
+                )
+
+    def test_version_shared_between_processes(self):
+        """Запись поста в другом процессе меняет ETag ленты."""
+        url = reverse('posts:rss')
+        etag = self.guest_client.get(url)['ETag']
+        with mock.patch.object(feeds, 'cache', _create_cache('default')):
+            feeds.feeds_changed()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
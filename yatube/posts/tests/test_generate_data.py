@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class GenerateDataTests(TestCase):
+    def generate(self, **options):
+        call_command(
+            'generate_data', users=30, groups=3, posts=200, comments=300,
+            follows=60, chunk_size=50, stdout=StringIO(), **options
+        )
+        return (
+            list(User.objects.order_by('pk').values_list('username')),
+            list(Post.objects.order_by('pk').values_list(
+                'text', 'author_id', 'group_id', 'pub_date'
+            )),
+            list(Comment.objects.order_by('pk').values_list(
+                'post_id', 'author_id', 'text'
+            )),
+            list(Follow.objects.order_by('pk').values_list(
+                'user_id', 'author_id'
+            )),
+        )
+
+    def test_counts_and_power_law(self):
+        """Создаётся заказанное число строк, активность неравномерна."""
+        self.generate(seed=1, workers=2)
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertEqual(Follow.objects.count(), 60)
+        self.assertFalse(Follow.objects.filter(user=F('author')).exists())
+        top = Post.objects.filter(author_id=User.objects.first().pk).count()
+        self.assertGreater(top, 200 / 30 * 3)
+
+    def test_deterministic_by_seed(self):
+        """Один и тот же seed даёт те же данные при любом числе процессов."""
+        first = self.generate(seed=7, workers=1)
+        for model in (Comment, Follow, Post, Group, User):
+            model.objects.all().delete()
+        second = self.generate(seed=7, workers=3)
+        self.assertEqual(first, second)
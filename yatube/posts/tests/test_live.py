@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import live
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class LivePostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.first = Post.objects.create(author=self.author, text='Первый')
+
+    def since(self, since, name='live_posts', **kwargs):
+        return self.guest_client.get(
+            reverse(f'posts:{name}', kwargs=kwargs), {'since': since}
+        ).json()
+
+    def test_nothing_new_does_not_touch_database(self):
+        """Пустая проверка отвечает из кеша."""
+        self.guest_client.get(reverse('posts:live_posts'))
+        with CaptureQueriesContext(connection) as queries:
+            data = self.since(self.first.pk)
+        self.assertEqual(data['results'], [])
+        self.assertEqual(len(queries), 0)
+
+    def test_new_posts_since_cursor(self):
+        """Новые посты отдаются по возрастанию id, с фильтром по группе."""
+        second = Post.objects.create(
+            author=self.author, text='Второй', group=self.group
+        )
+        third = Post.objects.create(author=self.author, text='Третий')
+        data = self.since(self.first.pk)
+        self.assertEqual(
+            [post['id'] for post in data['results']], [second.pk, third.pk]
+        )
+        self.assertEqual(data['last'], third.pk)
+        data = self.since(
+            self.first.pk, name='live_group_posts', slug='test-slug'
+        )
+        self.assertEqual(
+            [post['id'] for post in data['results']], [second.pk]
+        )
+
+    def test_falls_back_to_database(self):
+        """Если кольцо не покрывает курсор, отвечает база."""
+        cache.clear()
+        second = Post.objects.create(author=self.author, text='Второй')
+        cache.delete(live.RECENT_KEY)
+        self.assertEqual(
+            [post['id'] for post in self.since(0)['results']],
+            [self.first.pk, second.pk],
+        )
+
+    @mock.patch.object(live, 'LOCK_ATTEMPTS', 1)
+    def test_busy_ring_is_dropped(self):
+        """Если кольцо занято другим процессом, его место занимает база."""
+        cache.add(live.RECENT_LOCK_KEY, 1)
+        second = Post.objects.create(author=self.author, text='Второй')
+        self.assertIsNone(cache.get(live.RECENT_KEY))
+        self.assertEqual(
+            [post['id'] for post in self.since(self.first.pk)['results']],
+            [second.pk],
+        )
+
+    @mock.patch.object(live, 'STREAM_DURATION', 0.01)
+    @mock.patch.object(live, 'STREAM_INTERVAL', 0)
+    def test_stream(self):
+        """Поток SSE отдаёт новые посты событиями с id."""
+        second = Post.objects.create(author=self.author, text='Второй')
+        response = self.guest_client.get(
+            reverse('posts:live_stream'),
+            HTTP_LAST_EVENT_ID=str(self.first.pk),
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'id: {second.pk}\nevent: post\n', body)
+        self.assertNotIn(f'id: {self.first.pk}\n', body)
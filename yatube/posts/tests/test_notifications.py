@@ -0,0 +1,78 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.models import Task
+
+from .. import notifications
+from ..models import Follow, Notification, Post
+
+User = get_user_model()
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.readers = [
+            User.objects.create_user(username=f'reader{number}')
+            for number in range(5)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=cls.author) for reader in cls.readers
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.readers[0])
+
+    def test_followers_notified(self):
+        """Новый пост попадает во входящие всех подписчиков."""
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(
+            set(Notification.objects.values_list('user_id', flat=True)),
+            {reader.pk for reader in self.readers},
+        )
+        self.assertEqual(Notification.objects.get(
+            user=self.readers[0]
+        ).post, post)
+
+    @mock.patch('posts.tasks.FANOUT_INLINE', 2)
+    @mock.patch.object(notifications, 'FANOUT_BATCH', 2)
+    def test_large_fan_out_is_chunked(self):
+        """Сверх FANOUT_INLINE подписчики обходятся задачами по пачкам."""
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(Task.objects.count(), 1)
+        call_command('run_tasks', once=True, concurrency=1, stdout=StringIO())
+        call_command('run_tasks', once=True, concurrency=1, stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 5)
+
+    def test_unread_counter_in_header(self):
+        """Шапка показывает число непрочитанных, оно сбрасывается."""
+        Post.objects.create(author=self.author, text='Первый')
+        Post.objects.create(author=self.author, text='Второй')
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['unread_notifications'], 2)
+        self.assertContains(response, reverse('posts:notifications'))
+        self.client.post(reverse('posts:notifications_read'))
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(response.context['unread_notifications'], 0)
+
+    def test_mark_selected_read(self):
+        """Можно отметить прочитанными только выбранные уведомления."""
+        Post.objects.create(author=self.author, text='Первый')
+        Post.objects.create(author=self.author, text='Второй')
+        first = self.readers[0].notifications.last()
+        self.client.post(
+            reverse('posts:notifications_read'), {'notification': first.pk}
+        )
+        self.assertEqual(notifications.unread_count(self.readers[0].pk), 1)
+        self.assertTrue(Notification.objects.get(pk=first.pk).is_read)
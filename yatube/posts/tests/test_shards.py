@@ -0,0 +1,331 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.db import configure_sqlite
+from core.management.commands.gc_media import file_fields, referenced_files
+
+from .. import moderation, shards
+from ..models import ArchivedPost, Comment, Follow, MovedPost, Post
+
+User = get_user_model()
+
+SHARDS = ['posts_shard0', 'posts_shard1']
+
+
+@override_settings(POST_SHARDS=SHARDS)
+class ShardTests(TransactionTestCase):
+    databases = {'default', *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        for alias in SHARDS:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(cls.directory, f'{alias}.sqlite3'),
+            }
+        super().setUpClass()
+        for alias in SHARDS:
+            call_command('migrate', 'posts', database=alias, verbosity=0)
+            # Миграции снова включают проверку внешних ключей.
+            connections[alias].close()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections.databases[alias]
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.even = User.objects.create_user(username='even', id=10)
+        self.odd = User.objects.create_user(username='odd', id=11)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def legacy_post(self, author, text, **kwargs):
+        """Пост, написанный до включения шардов: лежит в default."""
+        with self.settings(POST_SHARDS=[]):
+            post = Post.objects.create(author=author, text=text, **kwargs)
+        cache.delete(shards.LEGACY_KEY)
+        return post
+
+    def test_foreign_keys_off_only_in_shards(self):
+        """Внешние ключи не проверяются только в соединениях шардов."""
+        for alias, expected in (('default', 1), ('posts_shard0', 0)):
+            configure_sqlite(None, connections[alias])
+            with self.subTest(alias=alias):
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('PRAGMA foreign_keys')
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def test_posts_stored_in_author_shard(self):
+        """Пост лежит в шарде автора, а его id указывает на тот же шард."""
+        first = Post.objects.create(author=self.odd, text='Первый')
+        second = Post.objects.create(author=self.odd, text='Второй')
+        other = Post.objects.create(author=self.even, text='Чётный')
+        self.assertEqual((first.pk, second.pk, other.pk), (1, 3, 4))
+        self.assertEqual(
+            list(Post.objects.using('posts_shard1').values_list(
+                'text', flat=True
+            ).order_by('pk')),
+            ['Первый', 'Второй'],
+        )
+        self.assertEqual(list(self.even.posts.all()), [other])
+        self.assertFalse(Post.objects.using('default').exists())
+
+    def test_index_merges_shards(self):
+        """Главная собирает посты всех шардов в порядке публикации."""
+        texts = []
+        for number in range(12):
+            author = self.odd if number % 3 else self.even
+            texts.append(Post.objects.create(
+                author=author, text=f'Пост {number}'
+            ).text)
+        response = self.client.get(reverse('posts:index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 12)
+        self.assertEqual(
+            [post.text for post in page_obj], texts[::-1][:10]
+        )
+        response = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual(
+            [post.text for post in response.context['page_obj']],
+            texts[::-1][10:],
+        )
+
+    def test_deep_page_loads_only_page_rows(self):
+        """Для слияния шарды отдают ключи, строки — только для среза."""
+        for number in range(12):
+            Post.objects.create(
+                author=self.odd if number % 3 else self.even,
+                text=f'Пост {number}',
+            )
+        queries = []
+        for alias in SHARDS:
+            context = CaptureQueriesContext(connections[alias])
+            context.__enter__()
+            self.addCleanup(context.__exit__, None, None, None)
+            queries.append(context)
+        # Запросы в том же потоке, чтобы их было видно.
+        with mock.patch.object(shards, 'gather', new=lambda func, items: [
+            func(item) for item in items
+        ]):
+            posts = shards.scatter(Post.objects.all())[10:12]
+        self.assertEqual(
+            [post.text for post in posts], ['Пост 1', 'Пост 0']
+        )
+        full_rows = [
+            query['sql'] for context in queries for query in context
+            if '"posts_post"."text"' in query['sql']
+        ]
+        self.assertTrue(full_rows)
+        for sql in full_rows:
+            self.assertIn(' IN (', sql)
+
+    def test_live_sees_posts_from_every_shard(self):
+        """id растут по всем шардам: живая лента не теряет посты."""
+        for number in range(3):
+            Post.objects.create(author=self.odd, text=f'Нечётный {number}')
+        last = self.client.get(reverse('posts:live_posts')).json()['last']
+        post = Post.objects.create(author=self.even, text='Чётный')
+        self.assertGreater(post.pk, last)
+        response = self.client.get(
+            reverse('posts:live_posts'), {'since': last}
+        )
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']], [post.pk]
+        )
+
+    def test_follow_index_reads_followed_shards(self):
+        """Лента подписок берёт посты только отслеживаемых авторов."""
+        Follow.objects.create(user=self.reader, author=self.odd)
+        followed = Post.objects.create(author=self.odd, text='Подписка')
+        Post.objects.create(author=self.even, text='Чужой')
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [followed])
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(
+            [item.post for item in response.context['page_obj']],
+            [followed],
+        )
+
+    def test_profile_and_post_detail(self):
+        """Профиль и страница поста читают шард автора."""
+        post = Post.objects.create(author=self.even, text='Пост')
+        Post.objects.create(author=self.odd, text='Другой')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'even'})
+        )
+        self.assertEqual(list(response.context['page_obj']), [post])
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            {'text': 'Комментарий'},
+        )
+        self.assertEqual(
+            Comment.objects.using('posts_shard0').get().author, self.reader
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(response.context['post'], post)
+        self.assertEqual(response.context['posts_count'], 1)
+        self.assertEqual(
+            [comment.text for comment in response.context['comments']],
+            ['Комментарий'],
+        )
+
+    def test_archive_from_shard(self):
+        """Архив забирает посты из шардов, их id не выдаются повторно."""
+        post = Post.objects.create(author=self.odd, text='Старый')
+        Post.objects.using('posts_shard1').filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        call_command('archive_posts', days=365, stdout=StringIO())
+        self.assertEqual(ArchivedPost.objects.get().pk, post.pk)
+        self.assertFalse(Post.objects.using('posts_shard1').exists())
+        self.assertEqual(
+            Post.objects.create(author=self.odd, text='Новый').pk, 3
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        self.assertTrue(response.context['is_archived'])
+
+    def test_archive_from_default_with_shards(self):
+        """archive_posts забирает и старые посты, оставшиеся в default."""
+        legacy = self.legacy_post(self.even, 'До шардов')
+        Post.objects.using('default').filter(pk=legacy.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        call_command('archive_posts', days=365, stdout=StringIO())
+        self.assertEqual(ArchivedPost.objects.get().pk, legacy.pk)
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertEqual(shards.hot_aliases(), SHARDS)
+
+    def test_legacy_posts_readable_and_moved(self):
+        """Старые посты из default видны, а shard_posts переносит их."""
+        old = self.legacy_post(self.odd, 'Старый')
+        with self.settings(POST_SHARDS=[]):
+            Comment.objects.create(post=old, author=self.reader, text='Ок')
+        new = Post.objects.create(author=self.odd, text='Новый')
+        self.assertGreater(new.pk, old.pk)
+        for url in (reverse('posts:index'), reverse('posts:follow_index')):
+            Follow.objects.get_or_create(user=self.reader, author=self.odd)
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(
+                    list(response.context['page_obj']), [new, old]
+                )
+        response = self.client.get(reverse('posts:api_index'))
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [new.pk, old.pk],
+        )
+        call_command('shard_posts', stdout=StringIO())
+        self.assertFalse(Post.objects.using('default').exists())
+        moved = Post.objects.using('posts_shard1').get(text='Старый')
+        self.assertEqual(MovedPost.objects.get(pk=old.pk).new_id, moved.pk)
+        self.assertEqual(
+            Comment.objects.using('posts_shard1').get().post_id, moved.pk
+        )
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': old.pk})
+        )
+        self.assertRedirects(
+            response,
+            reverse('posts:post_detail', kwargs={'post_id': moved.pk}),
+            status_code=301,
+        )
+        self.assertEqual(shards.hot_aliases(), SHARDS)
+
+    def test_user_delete_cascades_into_shards(self):
+        """Удаление пользователя убирает его посты и комментарии в шардах."""
+        post = Post.objects.create(author=self.odd, text='Пост')
+        other = Post.objects.create(author=self.even, text='Другой')
+        # QuerySet.create не передаёт роутеру экземпляр: save() — передаёт.
+        Comment(post=other, author=self.odd, text='Ок').save()
+        Comment(post=post, author=self.reader, text='Ок').save()
+        self.odd.delete()
+        self.assertFalse(Post.objects.using('posts_shard1').exists())
+        self.assertFalse(Comment.objects.using('posts_shard0').exists())
+        self.assertEqual(
+            list(Post.objects.using('posts_shard0')), [other]
+        )
+
+    def test_api_and_live_read_shards(self):
+        """API, живая лента и RSS собирают посты из всех баз."""
+        legacy = self.legacy_post(self.even, 'Старый')
+        posts = [
+            Post.objects.create(author=self.odd, text='Нечётный'),
+            Post.objects.create(author=self.even, text='Чётный'),
+        ]
+        response = self.client.get(
+            reverse('posts:api_profile', kwargs={'username': 'even'})
+        )
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [posts[1].pk, legacy.pk],
+        )
+        self.assertEqual(
+            response.json()['results'][0]['author']['username'], 'even'
+        )
+        cache.clear()
+        response = self.client.get(
+            reverse('posts:live_posts'), {'since': 0}
+        )
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            sorted([legacy.pk] + [post.pk for post in posts]),
+        )
+        response = self.client.get(reverse('posts:rss'))
+        for text in ('Старый', 'Нечётный', 'Чётный'):
+            self.assertContains(response, text)
+
+    def test_moderation_and_gc_see_shards(self):
+        """Пакетное удаление и gc_media находят посты во всех базах."""
+        legacy = self.legacy_post(self.even, 'Старый', image='posts/a.gif')
+        post = Post.objects.create(
+            author=self.odd, text='Новый', image='posts/b.gif'
+        )
+        self.assertEqual(
+            referenced_files(['posts/a.gif', 'posts/b.gif'], file_fields()),
+            {'posts/a.gif', 'posts/b.gif'},
+        )
+        moderation.delete_posts([legacy.pk, post.pk])
+        self.assertFalse(Post.objects.using('default').exists())
+        self.assertFalse(Post.objects.using('posts_shard1').exists())
+
+    def test_admin_lists_selected_shard(self):
+        """Список постов в админке показывает выбранную базу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        self.client.force_login(admin)
+        post = Post.objects.create(author=self.odd, text='Нечётный')
+        Post.objects.create(author=self.even, text='Чётный')
+        url = reverse('admin:posts_post_changelist')
+        response = self.client.get(url, {'shard': 'posts_shard1'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [post]
+        )
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,))
+        )
+        self.assertEqual(response.context['original'], post)
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.quiet_post = Post.objects.create(
+            author=cls.author,
+            text='Тихий пост',
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.author,
+            text='Горячий пост',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_comment_raises_post_and_group_score(self):
+        """Комментарий увеличивает рейтинг поста и его группы."""
+        post_score = Post.objects.get(pk=self.quiet_post.pk).trending_score
+        group_score = Group.objects.get(pk=self.group.pk).trending_score
+        Comment.objects.create(
+            post=self.quiet_post, author=self.reader, text='Комментарий'
+        )
+        Comment.objects.create(
+            post=self.hot_post, author=self.reader, text='Комментарий'
+        )
+        self.assertGreater(
+            Post.objects.get(pk=self.quiet_post.pk).trending_score,
+            post_score,
+        )
+        self.assertGreater(
+            Group.objects.get(pk=self.group.pk).trending_score,
+            group_score,
+        )
+
+    def test_follow_raises_recent_posts_only(self):
+        """Новый подписчик поднимает только свежие посты автора."""
+        old_post = Post.objects.create(author=self.author, text='Старый')
+        Post.objects.filter(pk=old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        old_score = Post.objects.get(pk=old_post.pk).trending_score
+        recent_score = Post.objects.get(pk=self.hot_post.pk).trending_score
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            Post.objects.get(pk=old_post.pk).trending_score, old_score
+        )
+        self.assertGreater(
+            Post.objects.get(pk=self.hot_post.pk).trending_score,
+            recent_score,
+        )
+
+    def test_score_decays_with_time(self):
+        """Одинаковый вес позже весит больше, чем раньше."""
+        now = timezone.now()
+        self.assertGreater(
+            trending.initial_score(0, now),
+            trending.initial_score(0, now - trending.HALF_LIFE),
+        )
+        self.assertAlmostEqual(
+            trending.initial_score(0, now)
+            - trending.initial_score(0, now - trending.HALF_LIFE),
+            1,
+        )
+
+    def test_trending_page_orders_by_score(self):
+        """Страница trending сортирует посты по рейтингу."""
+        for _ in range(3):
+            Comment.objects.create(
+                post=self.quiet_post, author=self.reader, text='Комментарий'
+            )
+        response = self.guest_client.get(reverse('posts:trending'))
+        self.assertTemplateUsed(response, 'posts/trending.html')
+        self.assertEqual(response.context['page_obj'][0], self.quiet_post)
+        self.assertIn(self.group, response.context['groups'])
+
+    def test_trending_tab_active(self):
+        """Вкладка «Популярное» подсвечена на странице trending."""
+        self.guest_client.force_login(self.reader)
+        response = self.guest_client.get(reverse('posts:trending'))
+        self.assertTrue(response.context['trending'])
+        self.assertContains(response, 'nav-link active')
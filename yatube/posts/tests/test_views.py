@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from ..models import Follow, Group, Post, Comment
 from ..forms import PostForm
+from ..views import ELLIPSIS, POST_STR, elided_page_range
 
 User = get_user_model()
 
@@ -248,3 +251,135 @@ class FollowTest(TestCase):
         )
         response = self.authorized_client.get(reverse("posts:follow_index"))
         self.assertNotIn(post.text, response.context["page_obj"])
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group
+            )
+            Comment.objects.create(post=post, author=self.user, text='Да')
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_posts(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        self.create_posts(1)
+        post = Post.objects.first()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:trending'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': post.id}),
+        )
+        before = {url: self.count_queries(url) for url in urls}
+        self.create_posts(5)
+        for number in range(5):
+            Comment.objects.create(post=post, author=self.author, text='Да')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+
+class PaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=author, text=f'Пост {number}')
+            for number in range(POST_STR * 30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_elided_page_range(self):
+        """Номера страниц: края, окно вокруг текущей и многоточия."""
+        self.assertEqual(
+            elided_page_range(25, 50),
+            [1, ELLIPSIS, 23, 24, 25, 26, 27, ELLIPSIS, 50],
+        )
+        self.assertEqual(elided_page_range(1, 50), [1, 2, 3, ELLIPSIS, 50])
+        self.assertEqual(elided_page_range(3, 5), [1, 2, 3, 4, 5])
+
+    def test_page_links_are_windowed(self):
+        """На странице не больше ссылок, чем в окне пагинатора."""
+        response = self.client.get(reverse('posts:index') + '?page=15')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.elided_page_range,
+                         [1, ELLIPSIS, 13, 14, 15, 16, 17, ELLIPSIS, 30])
+        self.assertContains(response, '?page=30')
+        self.assertNotContains(response, '?page=2"')
+
+
+class FeedFragmentTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        for number in range(POST_STR * 2 + 5):
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_fragments_continue_the_feed(self):
+        """Фрагменты продолжают ленту с места, где кончилась страница."""
+        urls = (
+            (reverse('posts:index'), reverse('posts:index_fragment')),
+            (
+                reverse('posts:profile', kwargs={'username': 'author'}),
+                reverse(
+                    'posts:profile_fragment', kwargs={'username': 'author'}
+                ),
+            ),
+        )
+        for page_url, fragment_url in urls:
+            with self.subTest(url=fragment_url):
+                page = self.client.get(page_url)
+                self.assertContains(page, fragment_url)
+                cursor = page.context['page_obj'].next_cursor
+                seen = [post.pk for post in page.context['page_obj']]
+                while cursor:
+                    response = self.client.get(
+                        fragment_url, {'cursor': cursor}
+                    )
+                    self.assertNotContains(response, '<html')
+                    self.assertLess(len(response.content), len(page.content))
+                    seen += [post.pk for post in response.context['posts']]
+                    cursor = response.get('X-Next-Cursor')
+                self.assertEqual(
+                    seen,
+                    list(Post.objects.values_list('pk', flat=True)),
+                )
+
+    def test_bad_cursor(self):
+        """Испорченный курсор — 400."""
+        response = self.client.get(
+            reverse('posts:index_fragment'), {'cursor': '!!!'}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,54 @@
+import math
+from datetime import datetime, timedelta
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least, Log, Power
+from django.utils import timezone
+
+# Scores live in log2 space: a post's score is log2 of the sum of its event
+# weights, each multiplied by 2 ** (event_time / HALF_LIFE). Dividing every
+# score by the same 2 ** (now / HALF_LIFE) keeps the ordering, so stored
+# scores never have to be decayed and each event is one UPDATE.
+TRENDING_EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = timedelta(hours=6)
+
+COMMENT_WEIGHT = 1.0
+FOLLOWER_WEIGHT = 0.1
+GROUP_POST_WEIGHT = 1.0
+
+# A new follower only boosts the author's posts published this recently.
+FOLLOW_BOOST_WINDOW = timedelta(days=2)
+
+
+def time_units(moment=None):
+    moment = moment or timezone.now()
+    return (moment - TRENDING_EPOCH) / HALF_LIFE
+
+
+def initial_score(followers_count, moment=None):
+    return time_units(moment) + math.log2(
+        1 + FOLLOWER_WEIGHT * followers_count
+    )
+
+
+def add_event(field, weight, moment=None):
+    """Выражение log2(2 ** field + weight * 2 ** time) без переполнения."""
+    event = Value(time_units(moment) + math.log2(weight))
+    high = Greatest(F(field), event, output_field=FloatField())
+    low = Least(F(field), event, output_field=FloatField())
+    return high + Log(
+        Value(2.0),
+        Value(1.0) + Power(Value(2.0), low - high),
+        output_field=FloatField(),
+    )
+
+
+def bump(queryset, weight, moment=None):
+    return queryset.update(
+        trending_score=add_event('trending_score', weight, moment)
+    )
+
+
+def follow_boost_queryset(author, moment=None):
+    moment = moment or timezone.now()
+    return author.posts.filter(pub_date__gte=moment - FOLLOW_BOOST_WINDOW)
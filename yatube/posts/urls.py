@@ -1,12 +1,13 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, live, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
     path('', views.index, name='index'),
+    path('trending/', views.trending, name='trending'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
@@ -23,5 +24,68 @@ urlpatterns = [
         views.profile_unfollow,
         name="profile_unfollow"
     ),
+    path('notifications/', views.notifications, name='notifications'),
+    path(
+        'notifications/read/',
+        views.notifications_read,
+        name='notifications_read'
+    ),
+    path('live/posts/', live.posts_since, name='live_posts'),
+    path('live/posts/stream/', live.posts_stream, name='live_stream'),
+    path(
+        'live/group/<slug:slug>/posts/',
+        live.group_posts_since,
+        name='live_group_posts'
+    ),
+    path(
+        'live/group/<slug:slug>/posts/stream/',
+        live.group_posts_stream,
+        name='live_group_stream'
+    ),
+    path('fragments/index/', views.index_fragment, name='index_fragment'),
+    path(
+        'fragments/profile/<str:username>/',
+        views.profile_fragment,
+        name='profile_fragment'
+    ),
+    path(
+        'fragments/follow/', views.follow_fragment, name='follow_fragment'
+    ),
+    path('feeds/rss/', feeds.cached_feed(feeds.PostsFeed()), name='rss'),
+    path(
+        'feeds/atom/', feeds.cached_feed(feeds.PostsAtomFeed()), name='atom'
+    ),
+    path(
+        'feeds/group/<slug:slug>/rss/',
+        feeds.cached_feed(feeds.GroupPostsFeed()),
+        name='group_rss'
+    ),
+    path(
+        'feeds/group/<slug:slug>/atom/',
+        feeds.cached_feed(feeds.GroupPostsAtomFeed()),
+        name='group_atom'
+    ),
+    path(
+        'feeds/profile/<str:username>/rss/',
+        feeds.cached_feed(feeds.AuthorPostsFeed()),
+        name='profile_rss'
+    ),
+    path(
+        'feeds/profile/<str:username>/atom/',
+        feeds.cached_feed(feeds.AuthorPostsAtomFeed()),
+        name='profile_atom'
+    ),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path(
+        'api/v1/groups/<slug:slug>/posts/',
+        api.group_posts,
+        name='api_group_posts'
+    ),
+    path(
+        'api/v1/profiles/<str:username>/posts/',
+        api.profile,
+        name='api_profile'
+    ),
+    path('api/v1/follow/posts/', api.follow_index, name='api_follow_index'),
 
 ]
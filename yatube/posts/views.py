@@ -1,68 +1,178 @@
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from . import archive, shards
+from .caches import (attach_authors, attach_groups, get_author_or_404,
+                     get_group_or_404)
+from .comments import rate_limited, submit_comment
+from .cursors import InvalidCursor, after_cursor, encode_cursor
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-
-User = get_user_model()
+from .models import ArchivedPost, Follow, Group, MovedPost, Post
+from .notifications import mark_read
+from .tasks import warm_thumbnails
 
 POST_STR = 10
+TRENDING_GROUPS = 5
+# Сколько номеров страниц показывать вокруг текущей и у краёв.
+PAGES_ON_EACH_SIDE = 2
+PAGES_ON_ENDS = 1
+ELLIPSIS = '…'
+TRENDING_ORDERING = ('-trending_score', '-pub_date', '-pk')
+
+
+def elided_page_range(number, num_pages, on_each_side=PAGES_ON_EACH_SIDE,
+                      on_ends=PAGES_ON_ENDS):
+    """Номера страниц вокруг текущей и по краям, пропуски — ELLIPSIS."""
+    # Многоточие ставится только вместо двух и более номеров.
+    if num_pages <= (on_each_side + on_ends) * 2 + 3:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > on_each_side + on_ends + 2:
+        pages += list(range(1, on_ends + 1)) + [ELLIPSIS]
+        start = number - on_each_side
+    else:
+        start = 1
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages += list(range(start, number + on_each_side + 1)) + [ELLIPSIS]
+        pages += list(range(num_pages - on_ends + 1, num_pages + 1))
+    else:
+        pages += list(range(start, num_pages + 1))
+    return pages
 
 
 def paginator(data, request):
     paginator = Paginator(data, POST_STR)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page = paginator.get_page(page_number)
+    page.object_list = attach_authors(attach_groups(list(page.object_list)))
+    page.elided_page_range = elided_page_range(
+        page.number, paginator.num_pages
+    )
+    if page.has_next():
+        last = page.object_list[-1]
+        page.next_cursor = encode_cursor(last.pub_date, last.pk)
+    return page
+
+
+def feed_fragment(request, post_list, group_links=False):
+    """Только посты после курсора, без base.html — для подгрузки ленты."""
+    try:
+        posts = list(
+            after_cursor(post_list, request.GET.get('cursor'))[:POST_STR + 1]
+        )
+    except InvalidCursor:
+        return HttpResponseBadRequest('Неверный курсор')
+    posts, rest = posts[:POST_STR], posts[POST_STR:]
+    response = render(request, 'posts/includes/feed_items.html', {
+        'posts': attach_authors(attach_groups(posts)),
+        'group_links': group_links,
+    })
+    if rest:
+        response['X-Next-Cursor'] = encode_cursor(
+            posts[-1].pub_date, posts[-1].pk
+        )
+    return response
+
+
+def followed_posts(user):
+    if shards.enabled():
+        # Подписки лежат в default: JOIN с шардами невозможен.
+        return shards.scatter(Post.objects.all(), author_ids=list(
+            user.follower.values_list('author_id', flat=True)
+        ))
+    return Post.objects.filter(author__following__user=user)
 
 
 def index(request):
-    post_list = Post.objects.all()
+    post_list = shards.scatter(Post.objects.all())
     context = {
         'page_obj': paginator(post_list, request),
+        'fragment_url': reverse('posts:index_fragment'),
     }
     return render(request, 'posts/index.html', context)
 
 
+def index_fragment(request):
+    return feed_fragment(
+        request, shards.scatter(Post.objects.all()), group_links=True
+    )
+
+
+def trending(request):
+    post_list = shards.scatter(
+        Post.objects.order_by('-trending_score', '-pub_date'),
+        ordering=TRENDING_ORDERING,
+    )
+    context = {
+        'page_obj': paginator(post_list, request),
+        'groups': Group.objects.order_by(
+            '-trending_score')[:TRENDING_GROUPS],
+        'trending': True,
+    }
+    return render(request, 'posts/trending.html', context)
+
+
 def group_posts(request, slug):
 
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = get_group_or_404(slug)
+    posts = shards.scatter(group.posts.all())
     context = {
         'group': group,
-        'posts': posts,
         'page_obj': paginator(posts, request),
     }
     return render(request, 'posts/group_list.html', context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    posts_count = post_list.count()
-    if request.user.is_authenticated:
+    author = get_author_or_404(username)
+    post_list = archive.author_posts(author)
+    page_obj = paginator(post_list, request)
+    if request.user.is_authenticated and request.user != author:
         following = request.user.follower.filter(author=author).exists()
     else:
         following = False
     context = {
         'author': author,
-        'page_obj': paginator(post_list, request),
-        'posts_count': posts_count,
-        'following': following
+        'page_obj': page_obj,
+        'posts_count': page_obj.paginator.count,
+        'following': following,
+        'fragment_url': reverse(
+            'posts:profile_fragment', kwargs={'username': author.username}
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def profile_fragment(request, username):
+    author = get_author_or_404(username)
+    return feed_fragment(request, archive.author_posts(author))
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    try:
+        post = archive.get_post_or_404(post_id)
+    except Http404:
+        # Старый адрес поста, перенесённого shard_posts в шард.
+        moved = MovedPost.objects.filter(pk=post_id).first()
+        if moved is None:
+            raise
+        return redirect(
+            'posts:post_detail', post_id=moved.new_id, permanent=True
+        )
+    attach_authors(attach_groups([post]))
     author = post.author
     form = CommentForm()
-    comments = post.comments.all()
+    comments = shards.select_related(post.comments.all(), 'author')
     context = {
         'author': author,
         'post': post,
         'form': form,
         'comments': comments,
+        'posts_count': author.posts_count,
+        'is_archived': isinstance(post, ArchivedPost),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -74,6 +184,8 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        if post.image:
+            warm_thumbnails.delay(post.pk)
         return redirect('posts:profile', username=post.author)
     context = {
         'form': form,
@@ -83,14 +195,17 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(shards.for_post(Post.objects, post_id),
+                             pk=post_id)
     form = PostForm(
         request.POST,
         files=request.FILES or None,
         instance=post
     )
     if request.method == "POST" and form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            warm_thumbnails.delay(post.pk)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -100,26 +215,39 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        shards.for_post(Post.objects.only('group'), post_id), pk=post_id
+    )
     form = CommentForm(request.POST or None)
     if form.is_valid():
+        if rate_limited(request.user.pk):
+            return HttpResponse(
+                'Слишком много комментариев, попробуйте позже', status=429
+            )
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        submit_comment(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts_follow = Post.objects.filter(author__following__user=request.user)
-    context = {'page_obj': paginator(posts_follow, request)}
+    context = {
+        'page_obj': paginator(followed_posts(request.user), request),
+        'fragment_url': reverse('posts:follow_fragment'),
+    }
     return render(request, 'posts/follow.html', context)
 
 
+@login_required
+def follow_fragment(request):
+    return feed_fragment(request, followed_posts(request.user))
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     if author != request.user:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username)
@@ -127,6 +255,30 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username)
+
+
+@login_required
+def notifications(request):
+    notification_list = request.user.notifications.all()
+    page_obj = Paginator(notification_list, POST_STR).get_page(
+        request.GET.get('page')
+    )
+    # Посты могут лежать в шардах: подставляем их отдельным запросом.
+    page_obj.object_list = shards.attach_posts(page_obj.object_list)
+    page_obj.elided_page_range = elided_page_range(
+        page_obj.number, page_obj.paginator.num_pages
+    )
+    attach_authors([notification.post for notification in page_obj])
+    context = {'page_obj': page_obj}
+    return render(request, 'posts/notifications.html', context)
+
+
+@login_required
+@require_POST
+def notifications_read(request):
+    ids = request.POST.getlist('notification') or None
+    mark_read(request.user.pk, ids)
+    return redirect('posts:notifications')
@@ -0,0 +1,78 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import _create_cache, cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+
+class CachedSessionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user', password='pass')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.login(username='user', password='pass')
+
+    def test_authenticated_page_makes_no_queries(self):
+        """Сессия и пользователь берутся из кеша, а не из базы."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertContains(response, 'Пользователь: user')
+        self.assertEqual(len(queries), 0)
+
+    def test_user_save_invalidates_cache(self):
+        """После изменения пользователя в шапке видны новые данные."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Пользователь: renamed')
+
+    def test_cache_shared_between_processes(self):
+        """Выход виден кешу, созданному отдельно, как в другом воркере."""
+        url = reverse('about:author')
+        self.authorized_client.get(url)
+        session_key = self.authorized_client.session.session_key
+        key = f'django.contrib.sessions.cached_db{session_key}'
+        other = _create_cache('default')
+        self.assertIsNotNone(other.get(key))
+        self.authorized_client.logout()
+        self.assertIsNone(other.get(key))
+
+    def test_clear_expired_sessions(self):
+        """Команда удаляет только просроченные сессии."""
+        Session.objects.all().delete()
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(
+                session_key=f'expired{number}',
+                session_data='',
+                expire_date=now - timedelta(days=1),
+            )
+        Session.objects.create(
+            session_key='alive',
+            session_data='',
+            expire_date=now + timedelta(days=1),
+        )
+        call_command(
+            'clear_expired_sessions', batch_size=2, stdout=StringIO()
+        )
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            ['alive'],
+        )
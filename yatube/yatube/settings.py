@@ -17,8 +17,8 @@ INTERNAL_IPS = [
 ]
 
 INSTALLED_APPS = [
-    'posts',
-    'core',
+    'posts.apps.PostsConfig',
+    'core.apps.CoreConfig',
     'about',
     'users.apps.UsersConfig',
     'django.contrib.admin',
@@ -55,6 +55,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.notifications',
             ],
         },
     },
@@ -67,9 +68,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединения живут между запросами; PRAGMA (WAL и прочие)
+        # выставляет core.db.configure_sqlite при их создании.
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            # Сколько секунд ждать снятия блокировки записи.
+            'timeout': 20,
+        },
     }
 }
 
+# Посты и комментарии можно разнести по нескольким файлам SQLite по id
+# автора (posts/shards.py): YATUBE_POST_SHARDS=4 добавит базы
+# posts_shard0..posts_shard3. Пустой список — всё хранится в default.
+POST_SHARDS = [
+    f'posts_shard{number}'
+    for number in range(int(os.environ.get('YATUBE_POST_SHARDS', 0)))
+]
+for alias in POST_SHARDS:
+    DATABASES[alias] = dict(
+        DATABASES['default'],
+        NAME=os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+    )
+
+DATABASE_ROUTERS = ['posts.shards.ShardRouter']
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -101,6 +124,16 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
 
+# `python manage.py collectstatic` кладёт сюда файлы с хешем в имени
+# и их .gz/.br версии; раздаёт их core.static.StaticFilesMiddleware.
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+AUTHENTICATION_BACKENDS = ['users.backends.CachedModelBackend']
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -111,6 +144,10 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Фоновые задачи выполняет `python manage.py run_tasks`;
+# True выполняет их сразу, внутри запроса.
+TASKS_ALWAYS_EAGER = False
+
 NUMBER_OF_POSTS = 10
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -119,8 +156,32 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# За прокси файлы из MEDIA_ROOT может отдавать сам прокси:
+# 'X-Accel-Redirect' (nginx, internal location MEDIA_ACCEL_PREFIX)
+# или 'X-Sendfile' (Apache, lighttpd). None — отдаёт core.media.
+MEDIA_ACCEL_HEADER = None
+
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Сессии, пользователь сессии, счётчики и реестры кешей должны быть
+# общими для всех процессов-воркеров: кеш процесса не узнает о выходе
+# или смене пароля в соседнем. По умолчанию — файлы на диске (SQLite и
+# так держит проект на одной машине), с YATUBE_MEMCACHED — memcached.
+if os.environ.get('YATUBE_MEMCACHED'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ['YATUBE_MEMCACHED'].split(','),
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(BASE_DIR, 'cache'),
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
+# Тесты работают со своим кешем во временном каталоге, не с кешем сайта.
+TEST_RUNNER = 'core.testing.TestRunner'
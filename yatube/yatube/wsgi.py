@@ -1,6 +1,11 @@
 import os
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from core.static import StaticFilesMiddleware
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
-application = get_wsgi_application()
+application = StaticFilesMiddleware(
+    get_wsgi_application(), settings.STATIC_ROOT, settings.STATIC_URL
+)